@@ -36,7 +36,9 @@ from obsidian_sync.anki.app.anki_app import AnkiApp
 from obsidian_sync.utils import format_add_on_message
 from obsidian_sync.constants import (
     ADD_ON_NAME, ADD_ON_ID, CONF_VAULT_PATH, CONF_SRS_FOLDER_IN_OBSIDIAN, CONF_SYNC_WITH_OBSIDIAN_ON_ANKI_WEB_SYNC,
-    CONF_ANKI_DECK_NAME_FOR_OBSIDIAN_IMPORTS, CONF_ADD_OBSIDIAN_URL_IN_ANKI
+    CONF_ANKI_DECK_NAME_FOR_OBSIDIAN_IMPORTS, CONF_ADD_OBSIDIAN_URL_IN_ANKI, CONF_VAULT_SCAN_WORKER_COUNT,
+    CONF_WATCH_VAULT_FOR_CHANGES, CONF_MARKUP_TRANSLATION_CACHE_SIZE_MB, CONF_MARKUP_TRANSLATION_PROCESS_COUNT,
+    CONF_SHOW_SYNC_TIMING_IN_TOOLTIP, CONF_WRITE_OBSIDIAN_FILES_IN_BACKGROUND
 )
 
 
@@ -85,6 +87,30 @@ class AddonConfig:
     def add_obsidian_url_in_anki(self) -> bool:
         return self.config[CONF_ADD_OBSIDIAN_URL_IN_ANKI]
 
+    @property
+    def vault_scan_worker_count(self) -> int:
+        return max(1, int(self.config[CONF_VAULT_SCAN_WORKER_COUNT]))
+
+    @property
+    def watch_vault_for_changes(self) -> bool:
+        return self.config[CONF_WATCH_VAULT_FOR_CHANGES]
+
+    @property
+    def markup_translation_cache_size_mb(self) -> int:
+        return max(0, int(self.config[CONF_MARKUP_TRANSLATION_CACHE_SIZE_MB]))
+
+    @property
+    def markup_translation_process_count(self) -> int:
+        return max(1, int(self.config[CONF_MARKUP_TRANSLATION_PROCESS_COUNT]))
+
+    @property
+    def show_sync_timing_in_tooltip(self) -> bool:
+        return self.config[CONF_SHOW_SYNC_TIMING_IN_TOOLTIP]
+
+    @property
+    def write_obsidian_files_in_background(self) -> bool:
+        return self.config[CONF_WRITE_OBSIDIAN_FILES_IN_BACKGROUND]
+
     def register_config_update_listener(self, listener: AddonConfigUpdateListener):
         self._config_update_listeners.append(listener)
 
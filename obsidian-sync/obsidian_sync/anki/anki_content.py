@@ -29,12 +29,12 @@
 # Any modifications to this file must keep this entire header intact.
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 from obsidian_sync.anki.app.anki_media_manager import AnkiReferencesManager
 from obsidian_sync.base_types.content import Field, Content, Properties, NoteProperties, Reference, NoteContent, \
     NoteField, TemplateField, MediaReference, ObsidianURLReference
-from obsidian_sync.markup_translator import MarkupTranslator
+from obsidian_sync.markup_translator import get_markup_translator
 
 
 @dataclass
@@ -108,20 +108,20 @@ class AnkiNoteProperties(NoteProperties):
 
 @dataclass
 class AnkiField(Field):
-    def __post_init__(self):
-        self._markup_translator = MarkupTranslator()
-
     def __eq__(self, other: object) -> bool:
         return super().__eq__(other)
 
     def set_from_markdown(self, markdown: str):
-        self.text = self._markup_translator.translate_markdown_to_html(markdown=markdown)
+        self.text = get_markup_translator().translate_markdown_to_html(markdown=markdown)
 
     def set_from_html(self, html: str):
         self.text = html
 
     def to_markdown(self) -> str:
-        markdown_text = self._markup_translator.translate_html_to_markdown(html=self.text)
+        markdown_text = self._get_derived_text(
+            representation="markdown",
+            derive=lambda: get_markup_translator().translate_html_to_markdown(html=self.text),
+        )
         return markdown_text
 
     def to_html(self) -> str:
@@ -190,6 +190,70 @@ class AnkiNoteField(NoteField, AnkiField):
         return field_text
 
 
+@dataclass
+class LazyAnkiNoteField(AnkiNoteField):
+    """An Anki note field holding the text of the card field as stored in Anki.
+
+    The references are only extracted from the card field text, and the field text only adapted to
+    them, on first access. Until then, the card field text is written back to Anki as is.
+    """
+
+    def __init__(
+        self, name: str, card_field_text: str, model_id: int, references_factory: "AnkiReferencesFactory"
+    ):
+        self.name = name
+        self._card_field_text = card_field_text
+        self._model_id = model_id
+        self._references_factory = references_factory
+        self._text: Optional[str] = None
+        self._references: Optional[List["AnkiReference"]] = None
+
+    def __eq__(self, other: object) -> bool:
+        return super().__eq__(other)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._extract_references()
+        return self._text
+
+    @text.setter
+    def text(self, text: str):
+        self._text = text
+
+    @property
+    def references(self) -> List["AnkiReference"]:
+        if self._references is None:
+            self._extract_references()
+        return self._references
+
+    @references.setter
+    def references(self, references: List["AnkiReference"]):
+        self._references = references
+
+    def to_anki_field_text(self) -> str:
+        if self._text is None and self._references is None:
+            field_text = self._card_field_text
+        else:
+            field_text = super().to_anki_field_text()
+        return field_text
+
+    def _extract_references(self):
+        references = self._references_factory.from_card_field_text(
+            model_id=self._model_id, card_field_text=self._card_field_text
+        )
+        adapted_field_text = self._card_field_text
+        for reference in references:
+            adapted_field_text = adapted_field_text.replace(
+                reference.to_anki_field_text(), reference.to_field_text()
+            )
+
+        if self._references is None:
+            self._references = references
+        if self._text is None:
+            self._text = adapted_field_text
+
+
 class AnkiReferencesFactory:
     def __init__(self, anki_references_manager: AnkiReferencesManager):
         self._references_manager = anki_references_manager
@@ -29,6 +29,7 @@
 # Any modifications to this file must keep this entire header intact.
 
 from dataclasses import dataclass
+from typing import Callable, Optional
 
 from obsidian_sync.anki.anki_content import AnkiNoteContent
 from obsidian_sync.base_types.note import Note
@@ -50,3 +51,30 @@ class AnkiNote(Note):
     @property
     def model_id(self) -> int:
         return self.content.properties.model_id
+
+
+@dataclass
+class LazyAnkiNote(AnkiNote):
+    """An Anki note known only by its ID until its content is first accessed."""
+
+    def __init__(self, note_id: int, content_loader: Callable[[int], AnkiNoteContent]):
+        self._note_id = note_id
+        self._content_loader = content_loader
+        self._content: Optional[AnkiNoteContent] = None
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, AnkiNote) and self.content == other.content
+
+    @property
+    def id(self) -> int:
+        return self._note_id
+
+    @property
+    def content(self) -> AnkiNoteContent:
+        if self._content is None:
+            self._content = self._content_loader(self._note_id)
+        return self._content
+
+    @content.setter
+    def content(self, content: AnkiNoteContent):
+        self._content = content
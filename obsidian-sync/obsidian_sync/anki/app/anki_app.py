@@ -27,25 +27,30 @@
 # listed here: <mailto:petioptrv@icloud.com>.
 #
 # Any modifications to this file must keep this entire header intact.
+import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple, Callable
+from typing import Dict, List, Tuple, Callable, Optional
 
 from PyQt6.QtGui import QAction, QKeySequence
 from PyQt6.QtWidgets import QFileDialog, QApplication
 import aqt
+from anki.collection import AddNoteRequest
+from anki.errors import InvalidInput
 from anki.notes import Note as AnkiSystemNote
+from anki.utils import split_fields, join_fields, ids2str
 
 from obsidian_sync.addon_metadata import AddonMetadata
 from obsidian_sync.anki.anki_content import AnkiTemplateContent, \
-    AnkiTemplateProperties, AnkiNoteProperties, AnkiNoteContent, AnkiNoteField, AnkiTemplateField, \
-    AnkiReferencesFactory
-from obsidian_sync.anki.anki_note import AnkiNote
+    AnkiTemplateProperties, AnkiNoteProperties, AnkiNoteContent, AnkiTemplateField, AnkiReferencesFactory, \
+    LazyAnkiNoteField
+from obsidian_sync.anki.anki_note import AnkiNote, LazyAnkiNote
 from obsidian_sync.anki.anki_notes_result import AnkiNotesResult
 from obsidian_sync.anki.anki_template import AnkiTemplate
 from obsidian_sync.anki.app.anki_media_manager import AnkiReferencesManager
 from obsidian_sync.base_types.note import Note
-from obsidian_sync.constants import ADD_ON_NAME, DEFAULT_NOTE_ID_FOR_NEW_NOTES, ADD_ON_ID
+from obsidian_sync.constants import ADD_ON_NAME, DEFAULT_NOTE_ID_FOR_NEW_NOTES, ADD_ON_ID, \
+    ANKI_NOTES_WRITE_CHUNK_SIZE
 
 
 class AnkiApp:
@@ -55,6 +60,7 @@ class AnkiApp:
             anki_references_manager=self._media_manager,
         )
         self._metadata = metadata
+        self._undo_entry_id: Optional[int] = None
 
     @property
     def config(self):
@@ -146,52 +152,77 @@ class AnkiApp:
         return updated_template
 
     def create_new_note_in_anki_from_note(self, note: Note, deck_name: str) -> AnkiNote:
-        assert note.content.properties.note_id == DEFAULT_NOTE_ID_FOR_NEW_NOTES
+        return self.create_new_notes_in_anki_from_notes(notes=[note], deck_name=deck_name)[0]
 
-        anki_note = self.create_new_empty_note_in_anki(model_id=note.content.properties.model_id, deck_name=deck_name)
-        note.content.properties.note_id = anki_note.id
-
-        anki_note = self.update_anki_note_with_note(reference_note=note)
-
-        return anki_note
-
-    def create_new_empty_note_in_anki(self, model_id: int, deck_name: str) -> AnkiNote:
+    def create_new_notes_in_anki_from_notes(self, notes: List[Note], deck_name: str) -> List[AnkiNote]:
+        """The notes are inserted with their fields already filled with the bulk `add_notes` of the collection,
+        in chunks of `ANKI_NOTES_WRITE_CHUNK_SIZE` notes. The IDs assigned in Anki are set on the notes."""
         col = aqt.mw.col
-
         deck_id = col.decks.add_normal_deck_with_name(name=deck_name).id
-        note_type = col.models.get(id=model_id)
-        note = col.new_note(notetype=note_type)
-
-        col.add_note(note=note, deck_id=deck_id)
-
-        anki_note = self.get_note_by_id(note_id=note.id)
+        anki_notes = []
+
+        for i in range(0, len(notes), ANKI_NOTES_WRITE_CHUNK_SIZE):
+            notes_chunk = notes[i:i + ANKI_NOTES_WRITE_CHUNK_SIZE]
+            add_note_requests = []
+            written_contents = []
+            for note in notes_chunk:
+                assert note.content.properties.note_id == DEFAULT_NOTE_ID_FOR_NEW_NOTES
+                anki_system_note = col.new_note(notetype=col.models.get(id=note.content.properties.model_id))
+                written_contents.append(
+                    self._set_anki_system_note_content(anki_system_note=anki_system_note, reference_note=note)
+                )
+                add_note_requests.append(AddNoteRequest(note=anki_system_note, deck_id=deck_id))
+            col.add_notes(requests=add_note_requests)
+            for note, add_note_request in zip(notes_chunk, add_note_requests):
+                note.content.properties.note_id = add_note_request.note.id
+            anki_notes.extend(
+                self._build_written_anki_notes(
+                    anki_system_notes=[add_note_request.note for add_note_request in add_note_requests],
+                    written_contents=written_contents,
+                )
+            )
 
-        return anki_note
+        return anki_notes
 
     def update_anki_note_with_note(self, reference_note: Note) -> AnkiNote:
-        col = aqt.mw.col
+        return self.update_anki_notes_with_notes(reference_notes=[reference_note])[0]
 
-        anki_system_note = col.get_note(id=reference_note.content.properties.note_id)
-        content_from_note = AnkiNoteContent.from_content(
-            content=reference_note.content,
-            references_factory=self._references_factory,
-        )
-
-        anki_system_note.tags = content_from_note.properties.tags
+    def update_anki_notes_with_notes(self, reference_notes: List[Note]) -> List[AnkiNote]:
+        """The notes are written with the bulk `update_notes` of the collection, in chunks of
+        `ANKI_NOTES_WRITE_CHUNK_SIZE` notes."""
+        col = aqt.mw.col
+        anki_notes = []
+
+        for i in range(0, len(reference_notes), ANKI_NOTES_WRITE_CHUNK_SIZE):
+            anki_system_notes = []
+            written_contents = []
+            for reference_note in reference_notes[i:i + ANKI_NOTES_WRITE_CHUNK_SIZE]:
+                anki_system_note = col.get_note(id=reference_note.content.properties.note_id)
+                written_contents.append(
+                    self._set_anki_system_note_content(
+                        anki_system_note=anki_system_note, reference_note=reference_note
+                    )
+                )
+                anki_system_notes.append(anki_system_note)
+            col.update_notes(notes=anki_system_notes)
+            anki_notes.extend(
+                self._build_written_anki_notes(anki_system_notes=anki_system_notes, written_contents=written_contents)
+            )
 
-        note_fields = {
-            field.name: field
-            for field in content_from_note.fields
-        }
-        model = col.models.get(id=content_from_note.properties.model_id)
-        anki_system_note.fields = [
-            note_fields[fld["name"]].to_anki_field_text()
-            for fld in model["flds"]
-        ]
+        return anki_notes
 
-        col.update_note(note=anki_system_note)
+    def start_undo_entry(self, name: str):
+        """The collection operations run until `end_undo_entry` is called are undone together."""
+        self._undo_entry_id = aqt.mw.col.add_custom_undo_entry(name=name)
 
-        return self.get_note_by_id(note_id=anki_system_note.id)
+    def end_undo_entry(self):
+        undo_entry_id = self._undo_entry_id
+        self._undo_entry_id = None
+        if undo_entry_id is not None:
+            try:
+                aqt.mw.col.merge_undo_entries(target=undo_entry_id)
+            except InvalidInput:  # the undo queue was cleared by an operation that cannot be undone
+                logging.exception("Failed to merge the sync undo entries.")
 
     def get_all_notes(self) -> Dict[int, AnkiNote]:
         categorized_notes = self.get_all_notes_categorized()
@@ -203,6 +234,8 @@ class AnkiApp:
         return anki_notes
 
     def get_all_notes_categorized(self) -> AnkiNotesResult:
+        """Only the notes created or modified since the last sync are loaded, with a single query on the
+        collection. The unchanged notes are only loaded if their content is accessed."""
         col = aqt.mw.col
 
         new_notes = []
@@ -210,19 +243,24 @@ class AnkiApp:
         unchanged_notes = {}
 
         last_sync_timestamp = self._metadata.last_sync_timestamp
-        note_ids_in_anki = col.find_notes("")
+        changed_notes_condition = "mod > ? OR id >= ?"
+        changed_notes_condition_arguments = (  # note IDs are creation timestamps in milliseconds
+            last_sync_timestamp, (last_sync_timestamp + 1) * 1000
+        )
+
+        for note_id in col.db.list(
+            f"SELECT id FROM notes WHERE NOT ({changed_notes_condition}) ORDER BY id",
+            *changed_notes_condition_arguments,
+        ):
+            unchanged_notes[note_id] = LazyAnkiNote(note_id=note_id, content_loader=self._load_note_content)
 
-        for note_id in note_ids_in_anki:
-            anki_system_note = col.get_note(note_id)
-            anki_note = self.get_note_by_id(note_id=note_id)
-            if self._get_anki_system_note_creation_timestamp(note=anki_system_note) > last_sync_timestamp:
+        for anki_note in self._query_notes(
+            condition=f"{changed_notes_condition} ORDER BY id", arguments=changed_notes_condition_arguments
+        ):
+            if self._get_note_creation_timestamp(note_id=anki_note.id) > last_sync_timestamp:
                 new_notes.append(anki_note)
             else:
-                modified_timestamp = self._get_anki_system_note_modified_timestamp(note=anki_system_note)
-                if modified_timestamp > last_sync_timestamp:
-                    updated_notes[anki_note.id] = anki_note
-                else:
-                    unchanged_notes[anki_note.id] = anki_note
+                updated_notes[anki_note.id] = anki_note
 
         return AnkiNotesResult(
             new_notes=new_notes, updated_notes=updated_notes, unchanged_notes=unchanged_notes
@@ -232,51 +270,33 @@ class AnkiApp:
         col = aqt.mw.col
         anki_system_note = col.get_note(note_id)
 
-        properties = AnkiNoteProperties(  # todo: refactor so that the `AnkiNoteProperties` class knows how to instantiate itself from an Anki system note to make it easier to extend the class
+        note = self._build_anki_note(
+            note_id=anki_system_note.id,
             model_id=anki_system_note.mid,
             model_name=anki_system_note.note_type()["name"],
-            note_id=anki_system_note.id,
             tags=anki_system_note.tags,
-            date_modified_in_anki=(
-                datetime.fromtimestamp(self._get_anki_system_note_modified_timestamp(note=anki_system_note))
+            modified_timestamp=self._get_note_modified_timestamp(
+                note_id=anki_system_note.id, modified_timestamp=anki_system_note.mod
             ),
+            field_names=anki_system_note.keys(),
+            field_texts=anki_system_note.fields,
         )
-        fields = []
-        model_id = anki_system_note.mid
-
-        note_refactored = False
-        for field_name, field_text in anki_system_note.items():
-            references = self._references_factory.from_card_field_text(
-                model_id=model_id, card_field_text=field_text
-            )
-            adapted_field_text = field_text
-            for reference in references:
-                adapted_field_text = adapted_field_text.replace(
-                    reference.to_anki_field_text(), reference.to_field_text()
-                )
-
-            fields.append(
-                AnkiNoteField(
-                    name=field_name,
-                    text=adapted_field_text,
-                    references=references,
-                )
-            )
-
-        if note_refactored:
-            col.update_note(note=anki_system_note)
-
-        content = AnkiNoteContent(properties=properties, fields=fields)
-        note = AnkiNote(content=content)
 
         return note
 
+    @staticmethod
+    def find_note_ids_with_empty_field(field_name: str) -> List[int]:
+        return aqt.mw.col.find_notes(query=f'"{field_name}:"')
+
     def delete_note_in_anki(self, note: AnkiNote):
         self.delete_note_by_id(note_id=note.id)
 
+    def delete_note_by_id(self, note_id: int):
+        self.delete_notes_by_ids(note_ids=[note_id])
+
     @staticmethod
-    def delete_note_by_id(note_id: int):
-        aqt.mw.col.remove_notes(note_ids=[note_id])
+    def delete_notes_by_ids(note_ids: List[int]):
+        aqt.mw.col.remove_notes(note_ids=note_ids)
 
     @staticmethod
     def show_info(text: str, title: str):
@@ -333,6 +353,10 @@ class AnkiApp:
     def add_profile_opened_hook(hook: Callable):
         aqt.gui_hooks.profile_did_open.append(hook)
 
+    @staticmethod
+    def add_profile_will_close_hook(hook: Callable):
+        aqt.gui_hooks.profile_will_close.append(hook)
+
     def get_open_editing_anki_windows(self):
         open_editing_windows = []
 
@@ -357,9 +381,148 @@ class AnkiApp:
     def _get_back_template_field_entry_string(field_name: str) -> str:
         return f"\n\n<hr id=\"{field_name}\">\n\n{{{{{field_name}}}}}"
 
-    def _get_anki_system_note_modified_timestamp(self, note: AnkiSystemNote) -> int:
-        return note.mod or self._get_anki_system_note_creation_timestamp(note=note)
+    def _load_note_content(self, note_id: int) -> AnkiNoteContent:
+        return self.get_note_by_id(note_id=note_id).content
+
+    def _query_notes(self, condition: str, arguments: Tuple = ()) -> List[AnkiNote]:
+        col = aqt.mw.col
+        model_names_and_field_names: Dict[int, Tuple[str, List[str]]] = {}
+        anki_notes = []
+
+        for note_id, model_id, modified_timestamp, tags, joined_field_texts in col.db.all(
+            f"SELECT id, mid, mod, tags, flds FROM notes WHERE {condition}", *arguments
+        ):
+            if model_id not in model_names_and_field_names:
+                model = col.models.get(id=model_id)
+                model_names_and_field_names[model_id] = (model["name"], [fld["name"] for fld in model["flds"]])
+            model_name, field_names = model_names_and_field_names[model_id]
+            modified_timestamp = self._get_note_modified_timestamp(
+                note_id=note_id, modified_timestamp=modified_timestamp
+            )
+            anki_note = self._build_anki_note(
+                note_id=note_id,
+                model_id=model_id,
+                model_name=model_name,
+                tags=col.tags.split(tags),
+                modified_timestamp=modified_timestamp,
+                field_names=field_names,
+                field_texts=split_fields(joined_field_texts),
+            )
+            anki_notes.append(anki_note)
+
+        return anki_notes
+
+    def _build_written_anki_notes(
+        self, anki_system_notes: List[AnkiSystemNote], written_contents: List[AnkiNoteContent]
+    ) -> List[AnkiNote]:
+        """The notes are built from the content written to Anki, with the modified timestamps read back in a
+        single query. If Anki adapted the written fields or tags, the notes are built from the stored ones
+        instead."""
+        col = aqt.mw.col
+        note_ids = [anki_system_note.id for anki_system_note in anki_system_notes]
+        stored_notes = {
+            note_id: (modified_timestamp, tags, joined_field_texts)
+            for note_id, modified_timestamp, tags, joined_field_texts in col.db.all(
+                f"SELECT id, mod, tags, flds FROM notes WHERE id IN {ids2str(note_ids)}"
+            )
+        }
+        anki_notes = []
+
+        for anki_system_note, written_content in zip(anki_system_notes, written_contents):
+            modified_timestamp, tags, joined_field_texts = stored_notes[anki_system_note.id]
+            modified_timestamp = self._get_note_modified_timestamp(
+                note_id=anki_system_note.id, modified_timestamp=modified_timestamp
+            )
+            tags = col.tags.split(tags)
+            if joined_field_texts == join_fields(anki_system_note.fields) and tags == anki_system_note.tags:
+                written_fields = {field.name: field for field in written_content.fields}
+                properties = AnkiNoteProperties(
+                    model_id=anki_system_note.mid,
+                    model_name=anki_system_note.note_type()["name"],
+                    note_id=anki_system_note.id,
+                    tags=tags,
+                    date_modified_in_anki=datetime.fromtimestamp(modified_timestamp),
+                )
+                anki_note = AnkiNote(
+                    content=AnkiNoteContent(
+                        properties=properties,
+                        fields=[written_fields[field_name] for field_name in anki_system_note.keys()],
+                    )
+                )
+            else:
+                anki_note = self._build_anki_note(
+                    note_id=anki_system_note.id,
+                    model_id=anki_system_note.mid,
+                    model_name=anki_system_note.note_type()["name"],
+                    tags=tags,
+                    modified_timestamp=modified_timestamp,
+                    field_names=anki_system_note.keys(),
+                    field_texts=split_fields(joined_field_texts),
+                )
+            anki_notes.append(anki_note)
+
+        return anki_notes
+
+    def _set_anki_system_note_content(
+        self, anki_system_note: AnkiSystemNote, reference_note: Note
+    ) -> AnkiNoteContent:
+        """Returns the content written to the note."""
+        col = aqt.mw.col
+
+        content_from_note = AnkiNoteContent.from_content(
+            content=reference_note.content,
+            references_factory=self._references_factory,
+        )
+
+        anki_system_note.tags = content_from_note.properties.tags
+
+        note_fields = {
+            field.name: field
+            for field in content_from_note.fields
+        }
+        model = col.models.get(id=content_from_note.properties.model_id)
+        anki_system_note.fields = [
+            note_fields[fld["name"]].to_anki_field_text()
+            for fld in model["flds"]
+        ]
+
+        return content_from_note
+
+    def _build_anki_note(
+        self,
+        note_id: int,
+        model_id: int,
+        model_name: str,
+        tags: List[str],
+        modified_timestamp: int,
+        field_names: List[str],
+        field_texts: List[str],
+    ) -> AnkiNote:
+        properties = AnkiNoteProperties(  # todo: refactor so that the `AnkiNoteProperties` class knows how to instantiate itself from an Anki system note to make it easier to extend the class
+            model_id=model_id,
+            model_name=model_name,
+            note_id=note_id,
+            tags=tags,
+            date_modified_in_anki=datetime.fromtimestamp(modified_timestamp),
+        )
+        fields = [
+            LazyAnkiNoteField(
+                name=field_name,
+                card_field_text=field_text,
+                model_id=model_id,
+                references_factory=self._references_factory,
+            )
+            for field_name, field_text in zip(field_names, field_texts)
+        ]
+
+        content = AnkiNoteContent(properties=properties, fields=fields)
+        note = AnkiNote(content=content)
+
+        return note
+
+    def _get_note_modified_timestamp(self, note_id: int, modified_timestamp: int) -> int:
+        return modified_timestamp or self._get_note_creation_timestamp(note_id=note_id)
 
     @staticmethod
-    def _get_anki_system_note_creation_timestamp(note: AnkiSystemNote) -> int:
-        return int(note.id / 1000)
+    def _get_note_creation_timestamp(note_id: int) -> int:
+        return int(note_id / 1000)
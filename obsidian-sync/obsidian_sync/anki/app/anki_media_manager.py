@@ -28,11 +28,11 @@
 #
 # Any modifications to this file must keep this entire header intact.
 
+from html.parser import HTMLParser
 from pathlib import Path
-from typing import List
+from typing import List, Tuple, Optional
 
 import aqt
-from bs4 import BeautifulSoup
 
 from obsidian_sync.base_types.content import MediaReference
 from obsidian_sync.file_utils import check_is_media_file
@@ -60,7 +60,27 @@ class AnkiReferencesManager:
 
     @staticmethod
     def get_obsidian_urls_from_card_field_text(field_text: str) -> List[str]:
-        soup = BeautifulSoup(field_text, "html.parser")
-        obsidian_links = soup.find_all("a", href=lambda href: href and href.startswith("obsidian://open"))
-        obsidian_urls = [link["href"] for link in obsidian_links]
+        """Most fields have no links, so the field is only parsed if it can contain an Obsidian URL
+        (the letters of the scheme can only be hidden from the check by numeric character references)."""
+        obsidian_urls = []
+        if "obsidian" in field_text or "&#" in field_text:
+            parser = ObsidianURLsHTMLParser()
+            parser.feed(field_text)
+            parser.close()
+            obsidian_urls = parser.obsidian_urls
         return obsidian_urls
+
+
+class ObsidianURLsHTMLParser(HTMLParser):
+    """Collects the Obsidian URLs linked to by the anchors of an HTML text, with their character references
+    decoded."""
+
+    def __init__(self):
+        super().__init__()
+        self.obsidian_urls: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        if tag == "a":
+            href = dict(attrs).get("href")  # the last duplicate attribute wins
+            if href and href.startswith("obsidian://open"):
+                self.obsidian_urls.append(href)
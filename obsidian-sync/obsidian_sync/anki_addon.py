@@ -72,6 +72,7 @@ class AnkiAddon:
     def _add_hooks(self):
         self._anki_app.add_sync_hook(hook=self._sync_with_obsidian_on_anki_web_sync)
         self._anki_app.add_profile_opened_hook(hook=self._on_profile_open)
+        self._anki_app.add_profile_will_close_hook(hook=self._on_profile_close)
 
     def _sync_with_obsidian_on_anki_web_sync(self):
         if self._addon_config.sync_with_obsidian_on_anki_web_sync:
@@ -80,6 +81,9 @@ class AnkiAddon:
     def _on_profile_open(self):
         self._metadata.anki_user = self._anki_app.anki_user
 
+    def _on_profile_close(self):
+        self._notes_synchronizer.stop_watching_vault()
+
     def _sync_with_obsidian(self):
         if self._check_can_sync():
             if self._obsidian_config.templates_enabled:
@@ -30,8 +30,9 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
+from hashlib import sha256
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Callable
 
 
 @dataclass
@@ -103,6 +104,9 @@ class NoteProperties(Properties):
 
 @dataclass
 class Field(ABC):
+    """The Markdown and HTML representations derived from the field text are cached until the text
+    changes, so comparing fields does not repeat the markup translations."""
+
     name: str
     text: str
 
@@ -111,8 +115,14 @@ class Field(ABC):
             isinstance(other, Field)
             and self.name == other.name
             and self.text == other.text
-            and self.to_markdown() == other.to_markdown()
-            and self.to_html() == other.to_html()
+            and (self._derives_markup_like(other=other) or self.markup_digest == other.markup_digest)
+        )
+
+    @property
+    def markup_digest(self) -> str:
+        return self._get_derived_text(
+            representation="digest",
+            derive=lambda: sha256(f"{self.to_markdown()}\0{self.to_html()}".encode("utf-8")).hexdigest(),
         )
 
     @abstractmethod
@@ -131,6 +141,25 @@ class Field(ABC):
     def to_html(self) -> str:
         ...
 
+    def _derives_markup_like(self, other: "Field") -> bool:
+        """Fields deriving their markup from the text in the same way have the same markup if they have
+        the same text."""
+        return (
+            type(self).to_markdown is type(other).to_markdown
+            and type(self).to_html is type(other).to_html
+        )
+
+    def _get_derived_text(self, representation: str, derive: Callable[[], str]) -> str:
+        text = self.text
+        if self.__dict__.get("_derived_texts_source") is not text:
+            self._derived_texts_source = text
+            self._derived_texts = {}
+        derived_text = self._derived_texts.get(representation)
+        if derived_text is None:
+            derived_text = derive()
+            self._derived_texts[representation] = derived_text
+        return derived_text
+
 
 @dataclass
 class TemplateField(Field, ABC):
@@ -41,6 +41,13 @@ DEFAULT_NOTE_MAXIMUM_CARD_DIFFICULTY_FOR_NEW_NOTES = 0.0
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 SMALL_FILE_SIZE_MB_CUT_OFF = 2 << 11  # 4 MB
 MEDIUM_FILE_SIZE_MG_CUT_OFF = 2 << 15  # 65 MB
+SRS_FILE_HEADER_READ_SIZE = 2 << 11  # 4 KB
+MARKUP_TRANSLATION_CACHE_VERSION = 1  # bump when the translation output changes without a source change
+MARKUP_TRANSLATION_CACHE_MEMORY_ENTRIES = 20_000
+MARKUP_TRANSLATION_PROCESS_BATCH_MIN_SIZE = 256  # smaller batches are not worth the process start-up
+MARKUP_TRANSLATION_PROCESS_CHUNKS_PER_PROCESS = 4
+NEW_NOTES_TRANSLATION_BATCH_SIZE = 500  # keeps the pre-translated fields within the in-memory cache
+ANKI_NOTES_WRITE_CHUNK_SIZE = 500
 
 IMAGE_FILE_SUFFIXES = [  # https://help.obsidian.md/Files+and+folders/Accepted+file+formats
     ".avif", ".bmp", ".gif", ".jpeg", ".jpg", ".png", ".svg", ".webp"
@@ -60,6 +67,10 @@ MEDIA_FILE_SUFFIXES = (
 ADD_ON_DIR = Path(__file__).parent.parent
 USER_FILES_PATH = ADD_ON_DIR / "user_files"  # persists across add-on updates
 ADD_ON_METADATA_PATH = USER_FILES_PATH / "addon_metadata.json"
+VAULT_INDEXES_PATH = USER_FILES_PATH / "vault_indexes"
+MARKUP_TRANSLATION_CACHE_PATH = USER_FILES_PATH / "markup_translation_cache.sqlite3"
+SYNC_REPORTS_PATH = USER_FILES_PATH / "sync_reports.jsonl"
+SYNC_REPORTS_MAX_COUNT = 1000
 
 OBSIDIAN_LINK_URL_FIELD_NAME = "Obsidian URL"
 
@@ -70,6 +81,12 @@ CONF_SRS_FOLDER_IN_OBSIDIAN = "srs-folder-in-obsidian"
 CONF_SYNC_WITH_OBSIDIAN_ON_ANKI_WEB_SYNC = "sync-with-obsidian-on-anki-web-sync"
 CONF_ANKI_DECK_NAME_FOR_OBSIDIAN_IMPORTS = "anki-deck-name-for-obsidian-imports"
 CONF_ADD_OBSIDIAN_URL_IN_ANKI = "add-obsidian-url-in-anki"
+CONF_VAULT_SCAN_WORKER_COUNT = "vault-scan-worker-count"
+CONF_WATCH_VAULT_FOR_CHANGES = "watch-vault-for-changes"
+CONF_MARKUP_TRANSLATION_CACHE_SIZE_MB = "markup-translation-cache-size-mb"
+CONF_MARKUP_TRANSLATION_PROCESS_COUNT = "markup-translation-process-count"
+CONF_SHOW_SYNC_TIMING_IN_TOOLTIP = "show-sync-timing-in-tooltip"
+CONF_WRITE_OBSIDIAN_FILES_IN_BACKGROUND = "write-obsidian-files-in-background"
 
 # ANKI
 
@@ -110,7 +127,29 @@ NOTE_ID_PROPERTY_NAME = "note ID"
 TAGS_PROPERTY_NAME = "tags"
 DATE_MODIFIED_PROPERTY_NAME = "date modified in Anki"
 
+# MARKUP
+
+MARKDOWN_TO_HTML_TRANSLATION = "markdown-to-html"
+HTML_TO_MARKDOWN_TRANSLATION = "html-to-markdown"
+SANITIZE_MARKDOWN_TRANSLATION = "sanitize-markdown"
+SANITIZE_HTML_TRANSLATION = "sanitize-html"
+TEXT_FIELD_TOKEN = "text"
+CODE_FIELD_TOKEN = "code"
+LATEX_FIELD_TOKEN = "latex"
+LINK_FIELD_TOKEN = "link"
+HTML_FIELD_TOKEN = "html"
+FIELD_TOKENS_CACHE_SIZE = 4096
+
 # regex patterns
 
 IN_LINE_MATCH_MARKDOWN_MATCHING_PATTERN = r"\$(.+?)\$"
 MATH_BLOCK_MARKDOWN_MATCHING_PATTERN = r"\$\$(.+?)\$\$"
+PLAIN_TEXT_MATCHING_PATTERN = (  # words and common punctuation only, that no markup syntax can start
+    r"(?!\d+[.)])[^\W_](?:[^\W_]|[,.;:?!'\"()/]| (?! ))*(?<! )"
+)
+FIELD_TOKEN_MATCHING_PATTERN = (  # the group names are the token kinds, tried in this order at each position
+    r"(?P<code>(?s:```.*?```)|`[^`\n]+`)"
+    r"|(?P<latex>\$\$.+?\$\$|\$.+?\$|\\\(.*?\\\)|\\\[.*?\\\])"
+    r"|(?P<link>!?\[[^\]]*\]\((?:[^()\"]|\"[^\"]*\"|\([^()]*\))*\))"
+    r"|(?P<html><!--(?s:.*?)-->|</?[A-Za-z][^<>]*>)"
+)
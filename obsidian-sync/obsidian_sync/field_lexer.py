@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Obsidian Sync Add-on for Anki
+#
+# Copyright (C)  2024 Petrov P.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <mailto:petioptrv@icloud.com>.
+#
+# Any modifications to this file must keep this entire header intact.
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+from obsidian_sync.constants import FIELD_TOKEN_MATCHING_PATTERN, FIELD_TOKENS_CACHE_SIZE, TEXT_FIELD_TOKEN
+
+_field_token_pattern = re.compile(FIELD_TOKEN_MATCHING_PATTERN)
+
+
+@dataclass(frozen=True)
+class FieldToken:
+    kind: str  # one of the `*_FIELD_TOKEN` constants
+    text: str
+
+
+@lru_cache(maxsize=FIELD_TOKENS_CACHE_SIZE)
+def tokenize_field_text(field_text: str) -> Tuple[FieldToken, ...]:
+    """Splits a field text into text, code, LaTeX, Markdown link (or embed) and HTML tag tokens in a single pass.
+
+    The tokens are cached, so the reference extraction and the markup translation of a field share one scan.
+    """
+    tokens = []
+    position = 0
+    for match in _field_token_pattern.finditer(field_text):
+        if match.start() > position:
+            tokens.append(FieldToken(kind=TEXT_FIELD_TOKEN, text=field_text[position:match.start()]))
+        tokens.append(FieldToken(kind=match.lastgroup, text=match.group()))
+        position = match.end()
+    if position < len(field_text):
+        tokens.append(FieldToken(kind=TEXT_FIELD_TOKEN, text=field_text[position:]))
+    return tuple(tokens)
@@ -27,21 +27,24 @@
 # listed here: <mailto:petioptrv@icloud.com>.
 #
 # Any modifications to this file must keep this entire header intact.
+import os
 import re
 from hashlib import sha256
 from pathlib import Path
 from string import ascii_letters, digits
-from typing import Optional
+from typing import Optional, List
 
 from send2trash import send2trash
 
 from obsidian_sync.constants import MARKDOWN_FILE_SUFFIX, SRS_NOTE_IDENTIFIER_COMMENT, MEDIA_FILE_SUFFIXES, \
-    SMALL_FILE_SIZE_MB_CUT_OFF, MEDIUM_FILE_SIZE_MG_CUT_OFF, NOTE_ID_PROPERTY_NAME
+    SMALL_FILE_SIZE_MB_CUT_OFF, MEDIUM_FILE_SIZE_MG_CUT_OFF, NOTE_ID_PROPERTY_NAME, SRS_PROPERTIES_DELIMITER, \
+    SRS_FILE_HEADER_READ_SIZE
 
 
 def check_is_srs_note_and_get_id(path: Path, text: Optional[str] = None) -> int:
+    """If the text is not provided, only the file header is read (see `read_srs_file_header`)."""
     note_id = -1
-    text = text or path.read_text(encoding="utf-8")
+    text = text or read_srs_file_header(path=path)
 
     if check_is_srs_file(path=path, text=text):
         note_id_matcher = fr"{NOTE_ID_PROPERTY_NAME}: ([\d]+)"
@@ -53,13 +56,38 @@ def check_is_srs_note_and_get_id(path: Path, text: Optional[str] = None) -> int:
 
 
 def check_is_srs_file(path: Path, text: Optional[str] = None) -> bool:
+    """If the text is not provided, only the file header is read (see `read_srs_file_header`)."""
     is_srs_file = False
     if check_is_markdown_file(path=path):
-        text = text or path.read_text(encoding="utf-8")
+        text = text or read_srs_file_header(path=path)
         is_srs_file = SRS_NOTE_IDENTIFIER_COMMENT in text
     return is_srs_file
 
 
+def read_srs_file_header(path: Path) -> str:
+    """Reads the beginning of the file containing the properties and the SRS note identifier.
+
+    The identifier always sits right after the properties frontmatter, so the file is read
+    in chunks only until the frontmatter is closed and the identifier had room to follow it.
+    The body of long regular notes is never read.
+    """
+    delimiter = SRS_PROPERTIES_DELIMITER.encode("utf-8")
+    identifier_length = len(SRS_NOTE_IDENTIFIER_COMMENT.encode("utf-8"))
+
+    with open(path, "rb") as f:
+        header = f.read(SRS_FILE_HEADER_READ_SIZE)
+        if header.startswith(delimiter):
+            properties_end = header.find(b"\n" + delimiter, len(delimiter))
+            while properties_end == -1 or len(header) - properties_end <= 2 * identifier_length:
+                chunk = f.read(SRS_FILE_HEADER_READ_SIZE)
+                if not chunk:
+                    break
+                header += chunk
+                properties_end = header.find(b"\n" + delimiter, len(delimiter))
+
+    return header.decode("utf-8", errors="ignore")
+
+
 def check_is_media_file(path: Path) -> bool:
     return path.suffix in MEDIA_FILE_SUFFIXES
 
@@ -68,8 +96,16 @@ def check_is_markdown_file(path: Path) -> bool:
     return path.suffix == MARKDOWN_FILE_SUFFIX
 
 
-def move_file_to_system_trash(file_path: Path):
-    send2trash(paths=file_path)
+def write_text_atomically(file_path: Path, text: str):
+    """The text is written to a hidden temporary file next to the target that then replaces it, so the
+    target is never left partially written."""
+    temporary_file_path = file_path.with_name(f".{file_path.name}.tmp")
+    temporary_file_path.write_text(text, encoding="utf-8")
+    os.replace(temporary_file_path, file_path)
+
+
+def move_files_to_system_trash(file_paths: List[Path]):
+    send2trash(paths=file_paths)
 
 
 def clean_string_for_file_name(string: str) -> str:
@@ -88,6 +124,10 @@ def check_files_are_identical(first: Path, second: Path) -> bool:
     return identical
 
 
+def calculate_text_hash(text: str) -> str:
+    return sha256(text.encode("utf-8")).hexdigest()
+
+
 def _check_file_content_is_identical(first: Path, second: Path) -> bool:
     identical = True
 
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# Obsidian Sync Add-on for Anki
+#
+# Copyright (C)  2024 Petrov P.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <mailto:petioptrv@icloud.com>.
+#
+# Any modifications to this file must keep this entire header intact.
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import List, Iterator, Dict
+
+from obsidian_sync.constants import DATETIME_FORMAT
+
+
+@dataclass
+class SyncPhaseReport:
+    name: str
+    seconds: float = 0
+    item_count: int = 0
+
+
+class SyncReport:
+    """Times the phases of a sync and counts the items each of them processed."""
+
+    def __init__(self):
+        self._started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._phases: List[SyncPhaseReport] = []
+
+    @property
+    def phases(self) -> List[SyncPhaseReport]:
+        return self._phases
+
+    @contextmanager
+    def time_phase(self, name: str) -> Iterator[SyncPhaseReport]:
+        phase = SyncPhaseReport(name=name)
+        start = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds = time.perf_counter() - start
+            self._phases.append(phase)
+
+    def to_summary(self) -> str:
+        phase_summaries = ", ".join(f"{phase.name} {phase.seconds:.2f}s" for phase in self._phases)
+        return f"Took {time.perf_counter() - self._start:.2f}s ({phase_summaries})."
+
+    def save(self, path: Path, counts: Dict[str, int], max_records: int):
+        """Appends the report to the JSON lines file, keeping only its last `max_records` records."""
+        record = {
+            "started_at": self._started_at.strftime(DATETIME_FORMAT),
+            "seconds": time.perf_counter() - self._start,
+            "counts": counts,
+            "phases": [asdict(phase) for phase in self._phases],
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"{json.dumps(record)}\n")
+        records = path.read_text(encoding="utf-8").splitlines(keepends=True)
+        if len(records) > max_records:
+            path.write_text("".join(records[-max_records:]), encoding="utf-8")
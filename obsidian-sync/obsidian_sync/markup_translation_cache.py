@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# Obsidian Sync Add-on for Anki
+#
+# Copyright (C)  2024 Petrov P.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <mailto:petioptrv@icloud.com>.
+#
+# Any modifications to this file must keep this entire header intact.
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+from typing import Optional, Dict, Tuple
+
+from obsidian_sync.constants import MARKUP_TRANSLATION_CACHE_MEMORY_ENTRIES
+
+
+class MarkupTranslationCache:
+    """Caches the results of the markup translations, keyed by the translation and the hash of the
+    translated text.
+
+    The entries are kept in an in-memory LRU tier and, once `load` is called with a positive size,
+    in a size-capped SQLite tier that persists across syncs. The on-disk entries are dropped when
+    the translator signature (library versions, extensions, etc.) changes. New on-disk entries are
+    only written when the cache is committed.
+
+    Texts that translate to themselves (e.g. already sanitized fields) are only stored as a stable
+    marker, so the cache does not hold a second copy of them.
+    """
+
+    def __init__(self, signature: str):
+        self._signature = signature
+        self._lock = threading.Lock()
+        self._memory_entries: "OrderedDict[Tuple[str, str], Optional[str]]" = OrderedDict()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._database_path: Optional[Path] = None
+        self._max_disk_size = 0
+        self._pending_entries: Dict[str, Optional[str]] = {}
+        self._used_keys = set()
+
+    def load(self, database_path: Path, max_disk_size_mb: int):
+        """Opens the on-disk tier, or closes it if the size is not positive."""
+        with self._lock:
+            if self._connection is not None and (database_path != self._database_path or max_disk_size_mb <= 0):
+                self._close()
+            self._max_disk_size = max_disk_size_mb * 1024 * 1024
+            if self._connection is None and self._max_disk_size > 0:
+                self._open(database_path=database_path)
+
+    def commit(self):
+        """Writes the new entries to disk and evicts the least recently used ones above the size cap."""
+        with self._lock:
+            if self._connection is not None:
+                try:
+                    self._write_pending_entries()
+                    self._evict_entries()
+                except sqlite3.Error:
+                    self._close()
+            self._pending_entries = {}
+            self._used_keys = set()
+
+    def get(self, translation: str, text: str) -> Optional[str]:
+        key = self._build_key(translation=translation, text=text)
+        with self._lock:
+            if key in self._memory_entries:
+                self._memory_entries.move_to_end(key)
+                is_cached, cached_text = True, self._memory_entries[key]
+            elif self._connection is not None:
+                is_cached, cached_text = self._get_from_disk(key=key)
+                if is_cached:
+                    self._put_in_memory(key=key, cached_text=cached_text)
+            else:
+                is_cached, cached_text = False, None
+        if not is_cached:
+            translated_text = None
+        elif cached_text is None:  # stable text
+            translated_text = text
+        else:
+            translated_text = cached_text
+        return translated_text
+
+    def put(self, translation: str, text: str, translated_text: str):
+        key = self._build_key(translation=translation, text=text)
+        cached_text = None if translated_text == text else translated_text
+        with self._lock:
+            self._put_in_memory(key=key, cached_text=cached_text)
+            if self._connection is not None:
+                self._pending_entries[self._build_disk_key(key=key)] = cached_text
+
+    @staticmethod
+    def _build_key(translation: str, text: str) -> Tuple[str, str]:
+        return translation, sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _build_disk_key(key: Tuple[str, str]) -> str:
+        return ":".join(key)
+
+    def _put_in_memory(self, key: Tuple[str, str], cached_text: Optional[str]):
+        self._memory_entries[key] = cached_text
+        self._memory_entries.move_to_end(key)
+        if len(self._memory_entries) > MARKUP_TRANSLATION_CACHE_MEMORY_ENTRIES:
+            self._memory_entries.popitem(last=False)
+
+    def _get_from_disk(self, key: Tuple[str, str]) -> Tuple[bool, Optional[str]]:
+        disk_key = self._build_disk_key(key=key)
+        if disk_key in self._pending_entries:
+            return True, self._pending_entries[disk_key]
+        try:
+            row = self._connection.execute("SELECT value FROM entries WHERE key = ?", (disk_key,)).fetchone()
+        except sqlite3.Error:
+            row = None
+        if row is None:
+            return False, None
+        self._used_keys.add(disk_key)
+        return True, row[0]
+
+    def _open(self, database_path: Path):
+        connection = None
+        try:
+            database_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(database_path), check_same_thread=False)
+            connection.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            row = connection.execute("SELECT value FROM metadata WHERE name = 'signature'").fetchone()
+            if row is None or row[0] != self._signature:
+                connection.execute("DROP TABLE IF EXISTS entries")
+                connection.execute(
+                    "INSERT OR REPLACE INTO metadata (name, value) VALUES ('signature', ?)", (self._signature,)
+                )
+            connection.execute(  # a NULL value marks a text that translates to itself
+                "CREATE TABLE IF NOT EXISTS entries"
+                " (key TEXT PRIMARY KEY, value TEXT, size INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+            )
+            connection.commit()
+        except sqlite3.Error:  # the cache is an optimization, syncing works without it
+            if connection is not None:
+                connection.close()
+            return
+        self._connection = connection
+        self._database_path = database_path
+
+    def _close(self):
+        self._connection.close()
+        self._connection = None
+        self._database_path = None
+
+    def _write_pending_entries(self):
+        last_used = int(time.time())
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+            (
+                (disk_key, cached_text, len(disk_key) + len((cached_text or "").encode("utf-8")), last_used)
+                for disk_key, cached_text in self._pending_entries.items()
+            ),
+        )
+        self._connection.executemany(
+            "UPDATE entries SET last_used = ? WHERE key = ?",
+            ((last_used, disk_key) for disk_key in self._used_keys),
+        )
+        self._connection.commit()
+
+    def _evict_entries(self):
+        total_size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        excess_size = total_size - self._max_disk_size
+        if excess_size > 0:
+            keys_to_evict = []
+            for disk_key, size in self._connection.execute("SELECT key, size FROM entries ORDER BY last_used"):
+                if excess_size <= 0:
+                    break
+                keys_to_evict.append((disk_key,))
+                excess_size -= size
+            self._connection.executemany("DELETE FROM entries WHERE key = ?", keys_to_evict)
+            self._connection.commit()
@@ -28,23 +28,46 @@
 #
 # Any modifications to this file must keep this entire header intact.
 
+import logging
+import math
+import multiprocessing
 import re
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from hashlib import sha256
+from pathlib import Path
 from textwrap import fill
+from types import ModuleType
+from typing import Optional, Callable, List, Dict
 
+import bs4
+import markdown
+import markdownify
 from bs4 import Tag
 from markdown.inlinepatterns import InlineProcessor
 
+import markdown_extensions
 from markdown_extensions.fenced_code import FencedCodeExtension
 from markdown_extensions.wikilinks import WikiLinkExtension
 from markdownify import ATX, MarkdownConverter as HTMLToMarkdownConverter
 from markdown import Markdown as MarkdownToHTMLConverter, Extension
 
 from obsidian_sync.constants import MATH_BLOCK_MARKDOWN_MATCHING_PATTERN, \
-    IN_LINE_MATCH_MARKDOWN_MATCHING_PATTERN
+    IN_LINE_MATCH_MARKDOWN_MATCHING_PATTERN, MARKUP_TRANSLATION_CACHE_VERSION, PLAIN_TEXT_MATCHING_PATTERN, \
+    MARKDOWN_TO_HTML_TRANSLATION, HTML_TO_MARKDOWN_TRANSLATION, SANITIZE_MARKDOWN_TRANSLATION, \
+    SANITIZE_HTML_TRANSLATION, MARKUP_TRANSLATION_PROCESS_BATCH_MIN_SIZE, MARKUP_TRANSLATION_PROCESS_CHUNKS_PER_PROCESS, \
+    LATEX_FIELD_TOKEN, FIELD_TOKEN_MATCHING_PATTERN
+from obsidian_sync import field_lexer as field_lexer_module
+from obsidian_sync.field_lexer import tokenize_field_text
+from obsidian_sync import markup_translation_cache as markup_translation_cache_module
+from obsidian_sync.markup_translation_cache import MarkupTranslationCache
 
 
 class MarkupTranslator:
-    def __init__(self):
+    def __init__(self, translation_cache: Optional[MarkupTranslationCache] = None):
+        self._translation_cache = translation_cache
         self._html_to_markdown_converter = ExtendedHTMLToMarkdownConverter(
             heading_style=ATX,
             convert_as_inline=True,
@@ -62,33 +85,215 @@ class MarkupTranslator:
         Ensures that the Markdown text can be converted to HTML and back to
         the original Markdown.
         """
-        html_from_markdown = self._markdown_to_html_converter.convert(source=markdown)
-        markdown_from_html = self._html_to_markdown_converter.convert(html=html_from_markdown)
-        html_from_markdown = self._markdown_to_html_converter.convert(source=markdown_from_html)
-        markdown_from_html = self._html_to_markdown_converter.convert(html=html_from_markdown)
-        return markdown_from_html
+        return self._get_cached_or_translate(
+            translation=SANITIZE_MARKDOWN_TRANSLATION, text=markdown, translate=self._sanitize_markdown
+        )
 
     def sanitize_html(self, html: str) -> str:
         """
         Ensures that the HTML text can be converted to Makrdown and back to
         the original HTML.
         """
-        markdown_from_html = self._html_to_markdown_converter.convert(html=html)
-        html_from_markdown = self._markdown_to_html_converter.convert(source=markdown_from_html)
-        markdown_from_html = self._html_to_markdown_converter.convert(html=html_from_markdown)
-        html_from_markdown = self._markdown_to_html_converter.convert(source=markdown_from_html)
-        return html_from_markdown
+        return self._get_cached_or_translate(
+            translation=SANITIZE_HTML_TRANSLATION, text=html, translate=self._sanitize_html
+        )
 
     def translate_html_to_markdown(self, html: str) -> str:
-        return self._html_to_markdown_converter.convert(html=html)
+        return self._get_cached_or_translate(
+            translation=HTML_TO_MARKDOWN_TRANSLATION, text=html, translate=self._convert_html_to_markdown
+        )
 
     def translate_markdown_to_html(self, markdown: str) -> str:
-        return self._markdown_to_html_converter.convert(source=markdown)
+        return self._get_cached_or_translate(
+            translation=MARKDOWN_TO_HTML_TRANSLATION, text=markdown, translate=self._convert_markdown_to_html
+        )
+
+    def translate_many(self, texts: List[str], translation: str, process_count: int = 1) -> List[str]:
+        """Applies one of the translations (e.g. `SANITIZE_HTML_TRANSLATION`) to a batch of texts.
+
+        The conversions are CPU-bound, so large batches of uncached texts are split in chunks and
+        translated in separate processes if `process_count` allows it. The texts are translated in
+        this process if that fails, or if Anki runs from a frozen build, where the spawned processes would
+        start the Anki binary instead of a Python interpreter.
+        """
+        translate = self._get_translate_function(translation=translation)
+        translated_texts: Dict[str, str] = {}
+        uncached_texts = []
+        for text in dict.fromkeys(texts):
+            translated_text = (
+                self._translation_cache.get(translation=translation, text=text)
+                if self._translation_cache is not None
+                else None
+            )
+            if translated_text is None:
+                uncached_texts.append(text)
+            else:
+                translated_texts[text] = translated_text
+
+        if (
+            process_count > 1
+            and len(uncached_texts) >= MARKUP_TRANSLATION_PROCESS_BATCH_MIN_SIZE
+            and not getattr(sys, "frozen", False)
+        ):
+            try:
+                translated_texts.update(
+                    self._translate_in_processes(
+                        texts=uncached_texts, translation=translation, process_count=process_count
+                    )
+                )
+                uncached_texts = []
+            except (OSError, BrokenProcessPool):
+                logging.exception("Failed to translate the markup in separate processes.")
+
+        for text in uncached_texts:
+            translated_texts[text] = self._get_cached_or_translate(
+                translation=translation, text=text, translate=translate
+            )
+
+        return [translated_texts[text] for text in texts]
+
+    def _translate_in_processes(self, texts: List[str], translation: str, process_count: int) -> Dict[str, str]:
+        process_count = min(process_count, multiprocessing.cpu_count())
+        chunk_size = math.ceil(len(texts) / (process_count * MARKUP_TRANSLATION_PROCESS_CHUNKS_PER_PROCESS))
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        translated_texts = {}
+        with ProcessPoolExecutor(  # forking would copy the threads and locks of Anki
+            max_workers=process_count, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            translated_chunks = executor.map(
+                _translate_in_process, [translation] * len(chunks), chunks
+            )
+            for chunk, translated_chunk in zip(chunks, translated_chunks):
+                for text, translated_text in zip(chunk, translated_chunk):
+                    translated_texts[text] = translated_text
+                    if self._translation_cache is not None:
+                        self._translation_cache.put(
+                            translation=translation, text=text, translated_text=translated_text
+                        )
+        return translated_texts
+
+    def _get_translate_function(self, translation: str) -> Callable[[str], str]:
+        translate_functions = {
+            MARKDOWN_TO_HTML_TRANSLATION: self._convert_markdown_to_html,
+            HTML_TO_MARKDOWN_TRANSLATION: self._convert_html_to_markdown,
+            SANITIZE_MARKDOWN_TRANSLATION: self._sanitize_markdown,
+            SANITIZE_HTML_TRANSLATION: self._sanitize_html,
+        }
+        return translate_functions[translation]
+
+    def _get_cached_or_translate(self, translation: str, text: str, translate: Callable[[str], str]) -> str:
+        if self._translation_cache is None:
+            return translate(text)
+        translated_text = self._translation_cache.get(translation=translation, text=text)
+        if translated_text is None:
+            translated_text = translate(text)
+            self._translation_cache.put(translation=translation, text=text, translated_text=translated_text)
+        return translated_text
+
+    def _sanitize_markdown(self, markdown: str) -> str:
+        html_from_markdown = self._convert_markdown_to_html(markdown=markdown)
+        markdown_from_html = self._convert_html_to_markdown(html=html_from_markdown)
+        if markdown_from_html != markdown:  # a text that survives the round trip is already sanitized
+            html_from_markdown = self._convert_markdown_to_html(markdown=markdown_from_html)
+            markdown_from_html = self._convert_html_to_markdown(html=html_from_markdown)
+        return markdown_from_html
+
+    def _sanitize_html(self, html: str) -> str:
+        markdown_from_html = self._convert_html_to_markdown(html=html)
+        html_from_markdown = self._convert_markdown_to_html(markdown=markdown_from_html)
+        if html_from_markdown != html:  # a text that survives the round trip is already sanitized
+            markdown_from_html = self._convert_html_to_markdown(html=html_from_markdown)
+            html_from_markdown = self._convert_markdown_to_html(markdown=markdown_from_html)
+        return html_from_markdown
+
+    def _convert_html_to_markdown(self, html: str) -> str:
+        """Plain text is left as is by the converter, and a plain text paragraph becomes a line of its own."""
+        if _check_is_plain_text(text=html):
+            markdown = html
+        elif html.startswith("<p>") and html.endswith("</p>") and _check_is_plain_text(text=html[3:-4]):
+            markdown = f"\n{html[3:-4]}\n"
+        else:
+            markdown = self._html_to_markdown_converter.convert(html=html)
+        return markdown
 
     @staticmethod
     def to_markdown_link(text: str, url: str) -> str:
         return f"[{text}]({url})"
 
+    def _convert_markdown_to_html(self, markdown: str) -> str:
+        """Plain text only becomes a paragraph, so it bypasses the converter. The converter keeps state
+        between conversions (e.g. stashed HTML and link references), so it is reset before each one."""
+        plain_text = markdown.strip("\n")
+        if _check_is_plain_text(text=plain_text):
+            html = f"<p>{plain_text}</p>"
+        else:
+            html = self._markdown_to_html_converter.reset().convert(source=markdown)
+        return html
+
+
+_plain_text_pattern = re.compile(PLAIN_TEXT_MATCHING_PATTERN)
+_thread_local = threading.local()
+_markup_translation_cache: Optional[MarkupTranslationCache] = None
+_markup_translation_cache_lock = threading.Lock()
+
+
+def get_markup_translator() -> MarkupTranslator:
+    """Returns the markup translator of the current thread.
+
+    Building a translator is costly and its converters are not thread-safe, so each thread reuses
+    its own instance.
+    """
+    markup_translator = getattr(_thread_local, "markup_translator", None)
+    if markup_translator is None:
+        markup_translator = MarkupTranslator(translation_cache=get_markup_translation_cache())
+        _thread_local.markup_translator = markup_translator
+    return markup_translator
+
+
+def get_markup_translation_cache() -> MarkupTranslationCache:
+    """Returns the translation cache shared by the markup translators of all threads."""
+    global _markup_translation_cache
+    with _markup_translation_cache_lock:
+        if _markup_translation_cache is None:
+            _markup_translation_cache = MarkupTranslationCache(signature=_build_markup_translation_cache_signature())
+    return _markup_translation_cache
+
+
+def _translate_in_process(translation: str, texts: List[str]) -> List[str]:
+    return get_markup_translator().translate_many(texts=texts, translation=translation)
+
+
+def _check_is_plain_text(text: str) -> bool:
+    return _plain_text_pattern.fullmatch(text) is not None
+
+
+def _build_markup_translation_cache_signature() -> str:
+    """Identifies the translation output so that the cached translations are dropped when it may change."""
+    signature_hash = sha256()
+    signature_hash.update(f"{MARKUP_TRANSLATION_CACHE_VERSION}".encode("utf-8"))
+    for pattern in [FIELD_TOKEN_MATCHING_PATTERN, PLAIN_TEXT_MATCHING_PATTERN]:
+        signature_hash.update(pattern.encode("utf-8"))
+    for library in [markdown, markdownify, bs4]:
+        signature_hash.update(f"{library.__name__}=={_get_library_version(library=library)}".encode("utf-8"))
+    source_paths = [
+        Path(__file__), Path(markup_translation_cache_module.__file__), Path(field_lexer_module.__file__)
+    ] + sorted(Path(markdown_extensions.__file__).parent.glob("*.py"))
+    for source_path in source_paths:
+        signature_hash.update(source_path.read_bytes())
+    return signature_hash.hexdigest()
+
+
+def _get_library_version(library: ModuleType) -> str:
+    """The frozen Anki builds ship the libraries without their distribution metadata, so the version is
+    taken from the module, or from the hash of its source if the module has no version attribute."""
+    library_version = getattr(library, "__version__", None)
+    if library_version is None:
+        try:
+            library_version = sha256(Path(library.__file__).read_bytes()).hexdigest()
+        except (OSError, TypeError):
+            library_version = "unknown"
+    return library_version
+
 
 class ExtendedHTMLToMarkdownConverter(HTMLToMarkdownConverter):
     def __getattr__(self, item):
@@ -136,6 +341,8 @@ class ExtendedHTMLToMarkdownConverter(HTMLToMarkdownConverter):
         if not text:
             return ""
 
+        latex_pattern = r"(\$.*?\$|\$\$.*?\$\$|\\\(.*?\\\)|\\\[.*?\\\])"
+
         def escape_non_latex(part):
             if self.options["escape_misc"]:
                 part = re.sub(r"([\\&<`[>~#=+|-])", r"\\\1", part)
@@ -146,15 +353,14 @@ class ExtendedHTMLToMarkdownConverter(HTMLToMarkdownConverter):
                 part = part.replace("_", r"\_")
             return part
 
-        latex_pattern = r"(\$.*?\$|\$\$.*?\$\$|\\\(.*?\\\)|\\\[.*?\\\])"
-        parts = re.split(latex_pattern, text)
+        def escape_token(token):
+            if token.kind == LATEX_FIELD_TOKEN:
+                return token.text
+            # code and link tokens can hold LaTeX of their own (e.g. `$a_b$` or [$a_b$](url))
+            parts = re.split(latex_pattern, token.text)
+            return "".join(part if re.match(latex_pattern, part) else escape_non_latex(part) for part in parts)
 
-        escaped = "".join(
-            part
-            if re.match(latex_pattern, part)
-            else escape_non_latex(part)
-            for part in parts
-        )
+        escaped = "".join(escape_token(token) for token in tokenize_field_text(field_text=text))
 
         return escaped
 
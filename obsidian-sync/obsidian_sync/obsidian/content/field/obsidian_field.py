@@ -36,12 +36,11 @@ from typing import List
 from obsidian_sync.addon_config import AddonConfig
 from obsidian_sync.base_types.content import Field
 from obsidian_sync.constants import SRS_NOTE_FIELD_IDENTIFIER_COMMENT, SRS_HEADER_TITLE_LEVEL
-from obsidian_sync.markup_translator import MarkupTranslator
+from obsidian_sync.markup_translator import get_markup_translator
 
 
 class ObsidianFieldFactory:
     def __init__(self, addon_config: AddonConfig):
-        self._markup_translator = MarkupTranslator()
         self._addon_config = addon_config
 
     @classmethod
@@ -67,9 +66,6 @@ class ObsidianFieldFactory:
 
 @dataclass
 class ObsidianField(Field, ABC):
-    def __post_init__(self):
-        self._markup_translator = MarkupTranslator()
-
     def __eq__(self, other: object) -> bool:
         return super().__eq__(other)
 
@@ -81,14 +77,17 @@ class ObsidianField(Field, ABC):
         self.text = markdown
 
     def set_from_html(self, html: str):
-        markdown = self._markup_translator.translate_html_to_markdown(html=html)
+        markdown = get_markup_translator().translate_html_to_markdown(html=html)
         self.text = markdown
 
     def to_markdown(self) -> str:
         return self.text
 
     def to_html(self) -> str:
-        html_text = self._markup_translator.translate_markdown_to_html(markdown=self.text)
+        html_text = self._get_derived_text(
+            representation="html",
+            derive=lambda: get_markup_translator().translate_markdown_to_html(markdown=self.text),
+        )
         return html_text
 
     def _build_field_title(self) -> str:
@@ -37,7 +37,7 @@ from typing import List
 from obsidian_sync.addon_config import AddonConfig
 from obsidian_sync.base_types.content import NoteField
 from obsidian_sync.constants import OBSIDIAN_LINK_URL_FIELD_NAME
-from obsidian_sync.markup_translator import MarkupTranslator
+from obsidian_sync.markup_translator import get_markup_translator
 from obsidian_sync.obsidian.content.obsidian_reference import ObsidianReferenceFactory, \
     ObsidianReference
 from obsidian_sync.obsidian.content.field.obsidian_field import ObsidianFieldFactory, ObsidianField
@@ -183,7 +183,7 @@ class ObsidianLinkURLNoteField(ObsidianNoteFieldBase):
         addon_config: AddonConfig,
         obsidian_reference_factory: ObsidianReferenceFactory,
     ) -> "ObsidianLinkURLNoteField":
-        markup_translator = MarkupTranslator()
+        markup_translator = get_markup_translator()
         obsidian_url = obsidian_url_for_note_path(
             vault_path=addon_config.obsidian_vault_path, note_path=note_path
         )
@@ -34,7 +34,8 @@ from typing import Optional, Dict
 from obsidian_sync.constants import OBSIDIAN_SETTINGS_FOLDER, OBSIDIAN_TEMPLATES_SETTINGS_FILE, \
     TEMPLATES_FOLDER_JSON_FIELD_NAME, OBSIDIAN_LOCAL_TRASH_OPTION_VALUE, OBSIDIAN_APP_SETTINGS_FILE, \
     OBSIDIAN_TRASH_OPTION_KEY, OBSIDIAN_LOCAL_TRASH_FOLDER, OBSIDIAN_USE_MARKDOWN_LINKS_OPTION_KEY, \
-    OBSIDIAN_TEMPLATES_OPTION_KEY, SRS_ATTACHMENTS_FOLDER, OBSIDIAN_CORE_PLUGINS_FILE
+    OBSIDIAN_TEMPLATES_OPTION_KEY, SRS_ATTACHMENTS_FOLDER, OBSIDIAN_CORE_PLUGINS_FILE, \
+    OBSIDIAN_ATTACHMENT_FOLDER_PATH_OPTION_KEY
 from obsidian_sync.addon_config import AddonConfig
 
 
@@ -84,6 +85,20 @@ class ObsidianConfig:
         path = self._addon_config.srs_folder / SRS_ATTACHMENTS_FOLDER
         return path
 
+    @property
+    def attachments_folder(self) -> Optional[Path]:
+        """The folder Obsidian saves new attachments to, if it is a single fixed folder.
+
+        The vault root ("/") and the folders relative to each note ("./...") are not fixed folders.
+        """
+        attachments_folder = None
+        attachments_folder_option = self._settings.get(OBSIDIAN_ATTACHMENT_FOLDER_PATH_OPTION_KEY)
+
+        if attachments_folder_option and not attachments_folder_option.startswith((".", "/")):
+            attachments_folder = self._addon_config.obsidian_vault_path / attachments_folder_option
+
+        return attachments_folder
+
     @property
     def _templates_settings(self) -> Dict[str, str]:
         templates_json_path = (
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# Obsidian Sync Add-on for Anki
+#
+# Copyright (C)  2024 Petrov P.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <mailto:petioptrv@icloud.com>.
+#
+# Any modifications to this file must keep this entire header intact.
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from obsidian_sync.file_utils import write_text_atomically
+
+
+class ObsidianFileWriter:
+    """Writes the Obsidian files on a background thread.
+
+    The files are written in the order they were queued. A file queued again before it was written is
+    only written once, with its latest text. `drain` waits for the queued files to be written.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._queued_texts: Dict[Path, str] = {}
+        self._writing_path: Optional[Path] = None
+        self._written_file_stats: Dict[Path, os.stat_result] = {}
+        self._write_error: Optional[OSError] = None
+
+    def write(self, path: Path, text: str):
+        with self._condition:
+            self._queued_texts[path] = text
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._write_queued_files, name="obsidian-file-writer", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify_all()
+
+    def drain(self) -> Dict[Path, os.stat_result]:
+        """Returns the stats of the files written since the last drain.
+
+        Raises the first error met while writing the files, once the others are written.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not self._queued_texts and self._writing_path is None)
+            written_file_stats = self._written_file_stats
+            write_error = self._write_error
+            self._written_file_stats = {}
+            self._write_error = None
+
+        if write_error is not None:
+            raise write_error
+
+        return written_file_stats
+
+    def _write_queued_files(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queued_texts)
+                path = next(iter(self._queued_texts))
+                text = self._queued_texts.pop(path)
+                self._writing_path = path
+
+            file_stats = None
+            write_error = None
+            try:
+                write_text_atomically(file_path=path, text=text)
+                file_stats = path.stat()
+            except OSError as e:
+                logging.exception(f"Failed to write {path}.")
+                write_error = e
+
+            with self._condition:
+                if file_stats is not None:
+                    self._written_file_stats[path] = file_stats
+                self._write_error = self._write_error or write_error
+                self._writing_path = None
+                self._condition.notify_all()
@@ -28,8 +28,10 @@
 #
 # Any modifications to this file must keep this entire header intact.
 import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Set, Tuple, Optional
 
 from obsidian_sync.addon_config import AddonConfig
 from obsidian_sync.addon_metadata import AddonMetadata
@@ -37,7 +39,7 @@ from obsidian_sync.anki.app.anki_app import AnkiApp
 from obsidian_sync.base_types.note import Note
 from obsidian_sync.constants import MAX_OBSIDIAN_NOTE_FILE_NAME_LENGTH, DEFAULT_NOTE_ID_FOR_NEW_NOTES
 from obsidian_sync.file_utils import clean_string_for_file_name, check_is_srs_file, check_is_srs_note_and_get_id, \
-    check_is_markdown_file
+    check_is_markdown_file, calculate_text_hash, read_srs_file_header
 from obsidian_sync.obsidian.obsidian_config import ObsidianConfig
 from obsidian_sync.obsidian.content.obsidian_content import ObsidianNoteContent
 from obsidian_sync.obsidian.content.field.obsidian_note_field import ObsidianNoteFieldFactory
@@ -90,8 +92,12 @@ class ObsidianNotesManager:
         unchanged_notes: Dict[int, ObsidianNote] = {}
 
         last_sync_timestamp = self._metadata.last_sync_timestamp
+        self._obsidian_vault.index.load()
+        self._obsidian_vault.attachments_manager.start_caching_vault_file_paths()
 
-        for note_id, note_file in self._get_srs_note_files_in_obsidian():
+        for note_id, note_file, is_updated in self._get_srs_note_files_in_obsidian(
+            last_sync_timestamp=last_sync_timestamp
+        ):
             note = ObsidianNote(file=note_file, note_id=note_id)
             if note_id in all_note_ids:
                 other_note = updated_notes.get(note.id, None) or unchanged_notes.get(note.id)
@@ -108,9 +114,7 @@ class ObsidianNotesManager:
             if note_id == DEFAULT_NOTE_ID_FOR_NEW_NOTES:
                 new_notes.append(note)
             else:
-                file_stats = note.file.path.stat()
-                last_modified_timestamp = int(max(file_stats.st_ctime, file_stats.st_mtime))  # this does not detect file move on Windows: https://docs.python.org/3.9/library/os.html#os.stat_result.st_ctime
-                if last_modified_timestamp > last_sync_timestamp:
+                if is_updated:
                     updated_notes[note_id] = note
                 else:
                     unchanged_notes[note_id] = note
@@ -118,9 +122,26 @@ class ObsidianNotesManager:
 
         return ObsidianNotesResult(new_notes=new_notes, updated_notes=updated_notes, unchanged_notes=unchanged_notes)
 
+    def commit_sync(self):
+        self._obsidian_vault.flush_file_writes()
+        self._obsidian_vault.index.commit()
+        self._obsidian_vault.watcher.commit_sync()
+
+    def end_sync(self):
+        """Called once the sync is over, whether it was committed or not."""
+        self._obsidian_vault.discard_file_writes()
+        self._obsidian_vault.index.unload()
+        self._obsidian_vault.attachments_manager.stop_caching_vault_file_paths()
+
+    def stop_watching_vault(self):
+        self._obsidian_vault.watcher.stop()
+
     def delete_note(self, note: ObsidianNote):
         self._obsidian_vault.delete_file(file=note.file)
 
+    def delete_notes(self, notes: List[ObsidianNote]):
+        self._obsidian_vault.delete_files(files=[note.file for note in notes])
+
     def get_relative_note_path(self, note: ObsidianNote) -> Path:
         return note.file.path.relative_to(self._addon_config.obsidian_vault_path)
 
@@ -149,7 +170,9 @@ class ObsidianNotesManager:
         )
         if file.content != content_from_note:
             file.content = content_from_note
-            self._obsidian_vault.save_file(file=file)
+            self._obsidian_vault.save_file(
+                file=file, in_background=self._addon_config.write_obsidian_files_in_background
+            )
 
         obsidian_note.file = file
 
@@ -161,17 +184,23 @@ class ObsidianNotesManager:
         )
         note_path = self._addon_config.srs_folder / note_file_name
 
-        if new_note and note_path.exists():  # the name is already taken
+        if new_note and self._check_note_path_is_taken(note_path=note_path):
             note_file_name = self._build_obsidian_note_file_name_from_note_front_field(
                 note=note, name_suffix=str(note.content.properties.note_id)
             )
             note_path = self._addon_config.srs_folder / note_file_name
 
-        if new_note and note_path.exists():  # this situation should not occur as notes have unique IDs
+        # this situation should not occur as notes have unique IDs
+        if new_note and self._check_note_path_is_taken(note_path=note_path):
             raise RuntimeError(f"Attempting to duplicate note with ID {note.content.properties.note_id}")
 
         return note_path
 
+    def _check_note_path_is_taken(self, note_path: Path) -> bool:
+        """The file system is checked as well as the vault file index because, on case-insensitive file
+        systems, a name differing from an existing one only by case is also taken."""
+        return note_path.exists() or self._obsidian_vault.attachments_manager.check_is_vault_file(path=note_path)
+
     @staticmethod
     def _build_obsidian_note_file_name_from_note_front_field(note: Note, name_suffix: str) -> str:
         file_extension = ".md"
@@ -184,33 +213,192 @@ class ObsidianNotesManager:
         file_name = f"{file_name}{file_extension}"
         return file_name
 
-    def _get_srs_note_files_in_obsidian(self) -> List[Tuple[int, ObsidianNoteFile]]:
+    def _get_srs_note_files_in_obsidian(self, last_sync_timestamp: int) -> List[Tuple[int, ObsidianNoteFile, bool]]:
+        """Lists the SRS note files along with whether they were updated since the last sync.
+
+        Only the files that changed since the vault index was last committed are read. A changed
+        file whose content hash matches its committed entry was only touched (e.g. re-downloaded
+        or restored from a backup) and is not considered updated.
+
+        When the vault watcher tracked every change since the last sync, only the changed paths
+        are stat-ed and the other files are listed from the index. Otherwise, the SRS folder is
+        scanned in full.
+
+        The changed files are read and pre-parsed on a pool of worker threads so that the
+        per-file I/O latency overlaps.
+        """
+        vault_index = self._obsidian_vault.index
         note_files = []
+        changed_paths = self._obsidian_vault.watcher.take_changed_paths()
+        if changed_paths is None:
+            markdown_files = self._get_markdown_files_in_srs_folder()
+        else:
+            markdown_files = self._get_markdown_files_in_srs_folder_from_index(changed_paths=changed_paths)
+        changed_file_paths = []
+        changed_file_stats = []
+        committed_content_hashes = {}
 
-        for file_path, file_text in self._get_srs_note_paths_and_text_in_obsidian():
-            note_id = check_is_srs_note_and_get_id(path=file_path, text=file_text)
-            if note_id != -1:
+        for file_path, file_stats in markdown_files:
+            index_entry = vault_index.get_entry(path=file_path)
+            file_is_changed = file_stats is not None and (
+                index_entry is None or not index_entry.matches_stats(file_stats=file_stats)
+            )
+            if file_is_changed:
+                changed_file_paths.append(file_path)
+                changed_file_stats.append(file_stats)
+                if index_entry is not None:
+                    committed_content_hashes[file_path] = index_entry.content_hash
+            elif index_entry.is_srs and index_entry.note_id != -1:
                 note_file = ObsidianNoteFile(
                     path=file_path, addon_config=self._addon_config, field_factory=self._field_factory
                 )
-                note_file.raw_content = file_text
-                note_files.append((note_id, note_file))
+                is_updated = self._check_is_updated(
+                    last_modified_timestamp=index_entry.last_modified_timestamp,
+                    last_sync_timestamp=last_sync_timestamp,
+                )
+                note_files.append((index_entry.note_id, note_file, is_updated))
+
+        with ThreadPoolExecutor(max_workers=self._addon_config.vault_scan_worker_count) as executor:
+            scanned_note_files = executor.map(
+                self._read_and_parse_note_file, changed_file_paths, changed_file_stats
+            )
+            for scanned_note_file in scanned_note_files:
+                index_entry = vault_index.update_entry(
+                    path=scanned_note_file.path,
+                    file_stats=scanned_note_file.file_stats,
+                    is_srs=scanned_note_file.is_srs,
+                    note_id=scanned_note_file.note_id,
+                    content_hash=scanned_note_file.content_hash,
+                )
+                if scanned_note_file.note_file is not None:
+                    committed_content_hash = committed_content_hashes.get(scanned_note_file.path)
+                    is_updated = (
+                        committed_content_hash is None
+                        or committed_content_hash != scanned_note_file.content_hash
+                    ) and self._check_is_updated(
+                        last_modified_timestamp=index_entry.last_modified_timestamp,
+                        last_sync_timestamp=last_sync_timestamp,
+                    )
+                    note_files.append((scanned_note_file.note_id, scanned_note_file.note_file, is_updated))
+
+        vault_index.retain_entries(paths=[file_path for file_path, _ in markdown_files])
 
         return note_files
 
-    def _get_srs_note_paths_and_text_in_obsidian(self) -> List[Tuple[Path, str]]:
-        templates_folder_path = self._obsidian_config.templates_folder
-        trash_path = self._obsidian_config.trash_folder
-        paths_and_text = []
-
-        for root, dirs, files in os.walk(self._addon_config.srs_folder):
-            root_path = Path(root)
-            if root_path not in [templates_folder_path, trash_path]:
-                for file in files:
-                    file_path = root_path / file
-                    if check_is_markdown_file(path=file_path):
-                        file_text = file_path.read_text(encoding="utf-8")
-                        if check_is_srs_file(path=file_path, text=file_text):
-                            paths_and_text.append((file_path, file_text))
-
-        return paths_and_text
+    @staticmethod
+    def _check_is_updated(last_modified_timestamp: int, last_sync_timestamp: int) -> bool:
+        # the ctime does not detect file move on Windows: https://docs.python.org/3.9/library/os.html#os.stat_result.st_ctime
+        return last_modified_timestamp > last_sync_timestamp
+
+    def _read_and_parse_note_file(self, file_path: Path, file_stats: os.stat_result) -> "ScannedNoteFile":
+        """Regular notes only cost a header read. The body of SRS notes is read in full since
+        changed SRS notes are synced and their content hash must be recorded."""
+        file_header = read_srs_file_header(path=file_path)
+        is_srs_file = check_is_srs_file(path=file_path, text=file_header)
+        note_id = check_is_srs_note_and_get_id(path=file_path, text=file_header) if is_srs_file else -1
+        note_file = None
+        file_text = None
+
+        if note_id != -1:
+            file_text = file_path.read_text(encoding="utf-8")
+            note_file = ObsidianNoteFile(
+                path=file_path, addon_config=self._addon_config, field_factory=self._field_factory
+            )
+            note_file.raw_content = file_text
+            try:
+                note_file.content = ObsidianNoteContent.from_obsidian_file_text(
+                    file_text=file_text, note_path=file_path, obsidian_field_factory=self._field_factory
+                )
+            except Exception:  # corrupted files are detected and handled by the synchronizer
+                pass
+
+        return ScannedNoteFile(
+            path=file_path,
+            file_stats=file_stats,
+            is_srs=is_srs_file,
+            note_id=note_id,
+            content_hash=calculate_text_hash(text=file_text) if file_text is not None else None,
+            note_file=note_file,
+        )
+
+    def _get_markdown_files_in_srs_folder(self) -> List[Tuple[Path, os.stat_result]]:
+        """Walks the SRS folder with `os.scandir` so that each file is stat-ed through its directory
+        entry only once. Excluded folders and hidden folders (e.g. `.obsidian` and `.trash`) are
+        pruned before they are descended into.
+        """
+        excluded_folder_paths = self._get_excluded_folder_paths()
+        markdown_files = []
+        folder_paths = [self._addon_config.srs_folder]
+
+        while folder_paths:
+            folder_path = folder_paths.pop()
+            try:
+                with os.scandir(folder_path) as entries:
+                    for entry in entries:
+                        entry_path = Path(entry.path)
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith(".") and entry_path not in excluded_folder_paths:
+                                folder_paths.append(entry_path)
+                        elif check_is_markdown_file(path=entry_path) and entry.is_file():
+                            markdown_files.append((entry_path, entry.stat()))
+            except OSError:  # matches os.walk, which skips the folders that cannot be listed
+                continue
+
+        return markdown_files
+
+    def _get_markdown_files_in_srs_folder_from_index(
+        self, changed_paths: Set[Path]
+    ) -> List[Tuple[Path, Optional[os.stat_result]]]:
+        """Lists the indexed files without stat-ing them (their stats are `None`) and stats the changed
+        files. The changed files that no longer exist are left out so that their entries are dropped."""
+        excluded_folder_paths = self._get_excluded_folder_paths()
+        markdown_files = []
+
+        for file_path in self._obsidian_vault.index.get_paths():
+            if file_path not in changed_paths and self._check_is_in_scanned_folders(
+                path=file_path, excluded_folder_paths=excluded_folder_paths
+            ):
+                markdown_files.append((file_path, None))
+
+        for file_path in changed_paths:
+            if self._check_is_in_scanned_folders(path=file_path, excluded_folder_paths=excluded_folder_paths):
+                try:
+                    markdown_files.append((file_path, file_path.stat()))
+                except FileNotFoundError:
+                    pass
+
+        return markdown_files
+
+    def _check_is_in_scanned_folders(self, path: Path, excluded_folder_paths: Set[Path]) -> bool:
+        srs_folder = self._addon_config.srs_folder
+        is_in_scanned_folders = check_is_markdown_file(path=path) and srs_folder in path.parents
+
+        if is_in_scanned_folders:
+            for folder_path in path.parents:
+                if folder_path == srs_folder:
+                    break
+                if folder_path.name.startswith(".") or folder_path in excluded_folder_paths:
+                    is_in_scanned_folders = False
+                    break
+
+        return is_in_scanned_folders
+
+    def _get_excluded_folder_paths(self) -> Set[Path]:
+        excluded_folder_paths = {
+            self._obsidian_config.templates_folder,
+            self._obsidian_config.srs_attachments_folder,
+        }
+        for folder_path in [self._obsidian_config.trash_folder, self._obsidian_config.attachments_folder]:
+            if folder_path is not None:
+                excluded_folder_paths.add(folder_path)
+        return excluded_folder_paths
+
+
+@dataclass
+class ScannedNoteFile:
+    path: Path
+    file_stats: os.stat_result
+    is_srs: bool
+    note_id: int
+    content_hash: Optional[str]
+    note_file: Optional[ObsidianNoteFile]
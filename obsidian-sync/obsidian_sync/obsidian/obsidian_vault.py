@@ -27,15 +27,21 @@
 # listed here: <mailto:petioptrv@icloud.com>.
 #
 # Any modifications to this file must keep this entire header intact.
+import logging
+import os
 from pathlib import Path
+from typing import Dict, Tuple, Optional, List
 
-from obsidian_sync.file_utils import move_file_to_system_trash
+from obsidian_sync.file_utils import move_files_to_system_trash, calculate_text_hash
 from obsidian_sync.addon_config import AddonConfig
 from obsidian_sync.obsidian.reference_manager import ObsidianReferencesManager
 from obsidian_sync.constants import OBSIDIAN_SYSTEM_TRASH_OPTION_VALUE, OBSIDIAN_LOCAL_TRASH_OPTION_VALUE, \
     OBSIDIAN_LOCAL_TRASH_FOLDER, OBSIDIAN_PERMA_DELETE_TRASH_OPTION_VALUE
 from obsidian_sync.obsidian.obsidian_config import ObsidianConfig
 from obsidian_sync.obsidian.obsidian_file import ObsidianFile
+from obsidian_sync.obsidian.obsidian_file_writer import ObsidianFileWriter
+from obsidian_sync.obsidian.obsidian_vault_index import ObsidianVaultIndex
+from obsidian_sync.obsidian.obsidian_vault_watcher import ObsidianVaultWatcher
 
 
 class ObsidianVault:
@@ -49,39 +55,124 @@ class ObsidianVault:
         self._attachments_manager = ObsidianReferencesManager(
             addon_config=addon_config, obsidian_config=obsidian_config
         )
+        self._index = ObsidianVaultIndex(addon_config=addon_config)
+        self._watcher = ObsidianVaultWatcher(addon_config=addon_config)
+        self._file_writer = ObsidianFileWriter()
+        self._pending_index_entries: Dict[Path, Tuple[int, Optional[str]]] = {}
 
     @property
     def attachments_manager(self) -> ObsidianReferencesManager:
         return self._attachments_manager
 
+    @property
+    def index(self) -> ObsidianVaultIndex:
+        return self._index
+
+    @property
+    def watcher(self) -> ObsidianVaultWatcher:
+        return self._watcher
+
     def get_path_relative_to_vault(self, absolute_path: Path) -> Path:
         relative_path = absolute_path.relative_to(self._obsidian_config.vault_folder)
         return relative_path
 
-    @staticmethod
-    def save_file(file: ObsidianFile):
+    def save_file(self, file: ObsidianFile, in_background: bool = False):
+        """If saved in the background, the file is only written and indexed once `flush_file_writes`
+        returns."""
         file_text = file.content.to_obsidian_file_text()
+        content_hash = calculate_text_hash(text=file_text)
 
         file.path.parent.mkdir(parents=True, exist_ok=True)
-        file.path.write_text(file_text, encoding="utf-8")
+        if in_background:
+            self._file_writer.write(path=file.path, text=file_text)
+            self._pending_index_entries[file.path] = (file.properties.note_id, content_hash)
+        else:
+            file.path.write_text(file_text, encoding="utf-8")
+            self._index.update_entry(
+                path=file.path,
+                file_stats=file.path.stat(),
+                is_srs=True,
+                note_id=file.properties.note_id,
+                content_hash=content_hash,
+            )
+        self._attachments_manager.register_vault_file(path=file.path)
+
+    def flush_file_writes(self):
+        pending_index_entries = self._pending_index_entries
+        self._pending_index_entries = {}
+
+        try:
+            written_file_stats = self._file_writer.drain()
+        except OSError:
+            for path in pending_index_entries:  # the files are read again on the next sync
+                self._index.remove_entry(path=path)
+            raise
+
+        for path, (note_id, content_hash) in pending_index_entries.items():
+            self._index.update_entry(
+                path=path,
+                file_stats=written_file_stats[path],
+                is_srs=True,
+                note_id=note_id,
+                content_hash=content_hash,
+            )
+
+    def discard_file_writes(self):
+        """Waits for the files queued by a sync that was not committed. Their index entries are dropped, so
+        they are read again on the next sync."""
+        self._pending_index_entries = {}
+        try:
+            self._file_writer.drain()
+        except OSError:
+            logging.exception("Failed to write the Obsidian files queued by the sync.")
 
     def delete_file(self, file: ObsidianFile):
+        self.delete_files(files=[file])
+
+    def delete_files(self, files: List[ObsidianFile]):
         """No need to delete linked resources (images, etc.). We don't know if the resource
         is linked to by other notes and deleting a file in obsidian does not delete the linked
         resources either."""
+        if not files:
+            return
+
+        self.flush_file_writes()  # a queued write must not recreate a deleted file
         trash_option = self._obsidian_config.trash_option
+        file_paths = [file.path for file in files]
 
-        if trash_option is None or trash_option == OBSIDIAN_SYSTEM_TRASH_OPTION_VALUE:
-            move_file_to_system_trash(file_path=file.path)
-        elif trash_option == OBSIDIAN_LOCAL_TRASH_OPTION_VALUE:
-            self._move_to_local_trash(file_path=file.path)
-        elif trash_option == OBSIDIAN_PERMA_DELETE_TRASH_OPTION_VALUE:
-            file.path.unlink()
-        else:
-            raise NotImplementedError  # unrecognized delete option
+        try:
+            if trash_option is None or trash_option == OBSIDIAN_SYSTEM_TRASH_OPTION_VALUE:
+                move_files_to_system_trash(file_paths=file_paths)
+            elif trash_option == OBSIDIAN_LOCAL_TRASH_OPTION_VALUE:
+                self._move_to_local_trash(file_paths=file_paths)
+            elif trash_option == OBSIDIAN_PERMA_DELETE_TRASH_OPTION_VALUE:
+                for file_path in file_paths:
+                    file_path.unlink()
+            else:
+                raise NotImplementedError  # unrecognized delete option
+        except OSError:  # the files deleted before the failure must still be forgotten
+            self._forget_deleted_files(file_paths=[file_path for file_path in file_paths if not file_path.exists()])
+            raise
 
-    def _move_to_local_trash(self, file_path: Path):
+        self._forget_deleted_files(file_paths=file_paths)
+
+    def _forget_deleted_files(self, file_paths: List[Path]):
+        for file_path in file_paths:
+            self._attachments_manager.unregister_vault_file(path=file_path)
+            self._index.remove_entry(path=file_path)
+
+    def _move_to_local_trash(self, file_paths: List[Path]):
+        """The names taken in the trash folder are listed once. A file whose name is taken is renamed
+        with a numbered suffix, e.g. `note 1.md`."""
         trash_folder = self._addon_config.obsidian_vault_path / OBSIDIAN_LOCAL_TRASH_FOLDER
         trash_folder.mkdir(parents=True, exist_ok=True)
-        new_file_path = trash_folder / file_path.name
-        file_path.rename(new_file_path)
+        taken_file_names = set(os.listdir(trash_folder))
+
+        for file_path in file_paths:
+            new_file_name = file_path.name
+            suffix_number = 0
+            while new_file_name in taken_file_names:
+                suffix_number += 1
+                new_file_name = f"{file_path.stem} {suffix_number}{file_path.suffix}"
+            taken_file_names.add(new_file_name)
+            file_path.rename(trash_folder / new_file_name)
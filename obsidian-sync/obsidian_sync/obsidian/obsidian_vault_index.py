@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# Obsidian Sync Add-on for Anki
+#
+# Copyright (C)  2024 Petrov P.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <mailto:petioptrv@icloud.com>.
+#
+# Any modifications to this file must keep this entire header intact.
+import json
+import os
+from dataclasses import dataclass, asdict
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, Optional, Iterable, List
+
+from obsidian_sync.addon_config import AddonConfig
+from obsidian_sync.constants import VAULT_INDEXES_PATH
+
+
+@dataclass
+class VaultIndexEntry:
+    mtime_ns: int
+    ctime_ns: int
+    size: int
+    is_srs: bool
+    note_id: int
+    content_hash: Optional[str]
+
+    def matches_stats(self, file_stats: os.stat_result) -> bool:
+        return (
+            self.mtime_ns == file_stats.st_mtime_ns
+            and self.ctime_ns == file_stats.st_ctime_ns
+            and self.size == file_stats.st_size
+        )
+
+    @property
+    def last_modified_timestamp(self) -> int:
+        return max(self.ctime_ns, self.mtime_ns) // 1_000_000_000
+
+
+class ObsidianVaultIndex:
+    """Persists the stat signature and SRS metadata of the markdown files in the vault.
+
+    A file whose stat signature (mtime, ctime and size) matches its entry has not been
+    touched since the entry was recorded, so its SRS flag, note ID and content hash can be
+    taken from the index without opening the file.
+
+    The index is loaded at the start of a sync and only written to disk when the sync is
+    committed. If a sync fails, the next one starts from the last committed state.
+    """
+
+    def __init__(self, addon_config: AddonConfig):
+        self._addon_config = addon_config
+        self._entries: Dict[str, VaultIndexEntry] = {}
+
+    def load(self):
+        self._entries = {}
+        file_path = self._get_file_path()
+        if file_path.exists():
+            try:
+                index_json = json.loads(s=file_path.read_text(encoding="utf-8"))
+                self._entries = {
+                    relative_path: VaultIndexEntry(**entry_json)
+                    for relative_path, entry_json in index_json.items()
+                }
+            except (ValueError, TypeError):  # corrupted index, rebuild it from the vault
+                self._entries = {}
+
+    def unload(self):
+        """Drops the entries recorded since the index was loaded if they were not committed."""
+        self._entries = {}
+
+    def commit(self):
+        file_path = self._get_file_path()
+        index_json = {
+            relative_path: asdict(entry)
+            for relative_path, entry in self._entries.items()
+        }
+        temp_file_path = file_path.with_suffix(".tmp")
+        temp_file_path.write_text(json.dumps(obj=index_json), encoding="utf-8")
+        os.replace(temp_file_path, file_path)
+
+    def get_paths(self) -> List[Path]:
+        return [self._addon_config.obsidian_vault_path / relative_path for relative_path in self._entries]
+
+    def get_entry(self, path: Path) -> Optional[VaultIndexEntry]:
+        return self._entries.get(self._get_key(path=path))
+
+    def update_entry(
+        self,
+        path: Path,
+        file_stats: os.stat_result,
+        is_srs: bool,
+        note_id: int,
+        content_hash: Optional[str],
+    ) -> VaultIndexEntry:
+        entry = VaultIndexEntry(
+            mtime_ns=file_stats.st_mtime_ns,
+            ctime_ns=file_stats.st_ctime_ns,
+            size=file_stats.st_size,
+            is_srs=is_srs,
+            note_id=note_id,
+            content_hash=content_hash,
+        )
+        self._entries[self._get_key(path=path)] = entry
+        return entry
+
+    def remove_entry(self, path: Path):
+        self._entries.pop(self._get_key(path=path), None)
+
+    def retain_entries(self, paths: Iterable[Path]):
+        """Drops the entries of the files that are no longer found in the vault."""
+        keys_to_retain = {self._get_key(path=path) for path in paths}
+        self._entries = {
+            key: entry
+            for key, entry in self._entries.items()
+            if key in keys_to_retain
+        }
+
+    def _get_key(self, path: Path) -> str:
+        return path.relative_to(self._addon_config.obsidian_vault_path).as_posix()
+
+    def _get_file_path(self) -> Path:
+        VAULT_INDEXES_PATH.mkdir(parents=True, exist_ok=True)
+        vault_path_hash = sha256(str(self._addon_config.obsidian_vault_path).encode("utf-8")).hexdigest()
+        return VAULT_INDEXES_PATH / f"{vault_path_hash[:16]}.json"
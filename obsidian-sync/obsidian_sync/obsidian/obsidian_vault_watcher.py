@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+# Obsidian Sync Add-on for Anki
+#
+# Copyright (C)  2024 Petrov P.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version, with the additions
+# listed at the end of the license file that accompanied this program
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+# NOTE: This program is subject to certain additional terms pursuant to
+# Section 7 of the GNU Affero General Public License.  You should have
+# received a copy of these additional terms immediately following the
+# terms and conditions of the GNU Affero General Public License that
+# accompanied this program.
+#
+# If not, please request a copy through one of the means of contact
+# listed here: <mailto:petioptrv@icloud.com>.
+#
+# Any modifications to this file must keep this entire header intact.
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from obsidian_sync.addon_config import AddonConfig
+from obsidian_sync.file_utils import check_is_markdown_file
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+
+_WATCH_MASK = (
+    _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+    | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+_EVENTS_BUFFER_SIZE = 64 * 1024
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    libc = None
+    if sys.platform.startswith("linux"):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc.inotify_init1  # noqa
+            libc.inotify_add_watch  # noqa
+        except (OSError, AttributeError):
+            libc = None
+    return libc
+
+
+_libc = _load_libc()
+
+
+class ObsidianVaultWatcher:
+    """Tracks the markdown files created, modified, moved or deleted in the SRS folder between
+    syncs using inotify (Linux only).
+
+    The tracked paths can only be trusted if every change since the last committed sync was
+    observed. If the watcher was not running, its event queue overflowed or a folder was created,
+    moved or deleted, `take_changed_paths` returns `None` and the SRS folder must be scanned in
+    full. The watcher is then restarted so that its watches match the folder tree again.
+    """
+
+    def __init__(self, addon_config: AddonConfig):
+        self._addon_config = addon_config
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify_fd: Optional[int] = None
+        self._stop_pipe: Optional[Tuple[int, int]] = None
+        self._watched_folder: Optional[Path] = None
+        self._folder_paths_by_watch: Dict[int, Path] = {}
+        self._changed_paths: Set[Path] = set()
+        self._is_tracking = False
+        self._pending_changed_paths: Set[Path] = set()
+        self._pending_full_scan = True
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def take_changed_paths(self) -> Optional[Set[Path]]:
+        """Returns the paths changed since the last committed sync, or `None` if a full scan is required.
+
+        The watcher is started on the first call, so the first sync always requires a full scan.
+        """
+        srs_folder = self._addon_config.srs_folder
+        watch_vault = self._addon_config.watch_vault_for_changes and _libc is not None
+
+        if self.is_running and (not watch_vault or self._watched_folder != srs_folder or not self._is_tracking):
+            self.stop()
+        if watch_vault and not self.is_running:
+            self._start(folder_path=srs_folder)
+
+        with self._lock:
+            self._pending_changed_paths.update(self._changed_paths)
+            self._changed_paths = set()
+            self._pending_full_scan = self._pending_full_scan or not self._is_tracking
+            self._is_tracking = self.is_running
+            changed_paths = None if self._pending_full_scan else set(self._pending_changed_paths)
+
+        return changed_paths
+
+    def commit_sync(self):
+        with self._lock:
+            self._pending_changed_paths = set()
+            self._pending_full_scan = False
+
+    def stop(self):
+        if self.is_running:
+            os.write(self._stop_pipe[1], b"\0")
+            self._thread.join()
+            self._thread = None
+            for fd in (self._inotify_fd, *self._stop_pipe):
+                os.close(fd)
+            self._inotify_fd = None
+            self._stop_pipe = None
+            self._folder_paths_by_watch = {}
+        with self._lock:
+            self._is_tracking = False
+
+    def _start(self, folder_path: Path):
+        inotify_fd = _libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if inotify_fd < 0:
+            error_number = ctypes.get_errno()
+            logging.error(f"Failed to initialize the vault watcher: {os.strerror(error_number)}")
+            return
+
+        self._inotify_fd = inotify_fd
+        self._watched_folder = folder_path
+        self._folder_paths_by_watch = {}
+        try:
+            self._add_watches(folder_path=folder_path)
+        except OSError:
+            logging.exception(f"Failed to watch {folder_path} for changes.")
+            os.close(inotify_fd)
+            self._inotify_fd = None
+            return
+
+        self._stop_pipe = os.pipe()
+        self._thread = threading.Thread(target=self._watch, name="obsidian-vault-watcher", daemon=True)
+        self._thread.start()
+
+    def _add_watches(self, folder_path: Path):
+        folder_paths = [folder_path]
+
+        while folder_paths:
+            folder_path = folder_paths.pop()
+            watch_descriptor = _libc.inotify_add_watch(self._inotify_fd, os.fsencode(folder_path), _WATCH_MASK)
+            if watch_descriptor < 0:
+                error_number = ctypes.get_errno()
+                if error_number in (errno.ENOENT, errno.ENOTDIR):  # removed while being watched
+                    continue
+                raise OSError(error_number, os.strerror(error_number), str(folder_path))
+            self._folder_paths_by_watch[watch_descriptor] = folder_path
+            try:
+                with os.scandir(folder_path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."):
+                            folder_paths.append(Path(entry.path))
+            except OSError:
+                continue
+
+    def _watch(self):
+        try:
+            while True:
+                readable_fds, _, _ = select.select([self._inotify_fd, self._stop_pipe[0]], [], [])
+                if self._stop_pipe[0] in readable_fds:
+                    break
+                try:
+                    events_buffer = os.read(self._inotify_fd, _EVENTS_BUFFER_SIZE)
+                except BlockingIOError:
+                    continue
+                self._process_events(events_buffer=events_buffer)
+        except Exception:
+            logging.exception("The vault watcher stopped unexpectedly.")
+            self._invalidate()
+
+    def _process_events(self, events_buffer: bytes):
+        offset = 0
+
+        while offset < len(events_buffer):
+            watch_descriptor, mask, _, name_length = _EVENT_HEADER.unpack_from(events_buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(events_buffer[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+            self._process_event(watch_descriptor=watch_descriptor, mask=mask, name=name)
+
+    def _process_event(self, watch_descriptor: int, mask: int, name: str):
+        folder_path = self._folder_paths_by_watch.get(watch_descriptor)
+
+        if mask & _IN_Q_OVERFLOW:
+            self._invalidate()
+        elif mask & _IN_IGNORED:
+            self._folder_paths_by_watch.pop(watch_descriptor, None)
+        elif folder_path is None or name.startswith("."):
+            pass
+        elif mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+            self._invalidate()
+        elif mask & _IN_ISDIR:
+            if mask & (_IN_CREATE | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_DELETE):
+                self._invalidate()
+            if mask & (_IN_CREATE | _IN_MOVED_TO):
+                try:
+                    self._add_watches(folder_path=folder_path / name)
+                except OSError:
+                    logging.exception(f"Failed to watch {folder_path / name} for changes.")
+        else:
+            file_path = folder_path / name
+            if check_is_markdown_file(path=file_path):
+                with self._lock:
+                    self._changed_paths.add(file_path)
+
+    def _invalidate(self):
+        with self._lock:
+            self._is_tracking = False
@@ -28,17 +28,21 @@
 #
 # Any modifications to this file must keep this entire header intact.
 
+import os
 import re
 import shutil
+import threading
 import unicodedata
 import urllib.parse
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple, Pattern
 
 from obsidian_sync.addon_config import AddonConfig
 from obsidian_sync.base_types.content import MediaReference, ObsidianURLReference
-from obsidian_sync.constants import MEDIA_FILE_SUFFIXES, MARKDOWN_FILE_SUFFIX
+from obsidian_sync.constants import MEDIA_FILE_SUFFIXES, MARKDOWN_FILE_SUFFIX, LINK_FIELD_TOKEN
+from obsidian_sync.field_lexer import tokenize_field_text
 from obsidian_sync.file_utils import check_files_are_identical
 from obsidian_sync.obsidian.obsidian_config import ObsidianConfig
 from obsidian_sync.obsidian.utils import obsidian_url_for_note_path
@@ -50,11 +54,48 @@ class ObsidianReferencesManager:
     ):
         self._addon_config = addon_config
         self._obsidian_config = obsidian_config
+        self._vault_file_paths_by_name: Optional[Dict[str, List[Path]]] = None
+        self._vault_file_paths_lock = threading.Lock()
+        self._cache_vault_file_paths = False
 
     @property
     def vault_path(self) -> Path:
         return self._addon_config.obsidian_vault_path
 
+    def start_caching_vault_file_paths(self):
+        """The vault files are indexed by name on the first reference resolution and the index is kept
+        until `stop_caching_vault_file_paths` is called. The files created and deleted in the meantime
+        must be registered with `register_vault_file` and `unregister_vault_file`."""
+        with self._vault_file_paths_lock:
+            self._vault_file_paths_by_name = None
+            self._cache_vault_file_paths = True
+
+    def stop_caching_vault_file_paths(self):
+        with self._vault_file_paths_lock:
+            self._vault_file_paths_by_name = None
+            self._cache_vault_file_paths = False
+
+    def register_vault_file(self, path: Path):
+        with self._vault_file_paths_lock:
+            if self._vault_file_paths_by_name is not None:
+                paths = self._vault_file_paths_by_name.setdefault(os.path.normcase(path.name), [])
+                if path not in paths:
+                    paths.append(path)
+
+    def unregister_vault_file(self, path: Path):
+        with self._vault_file_paths_lock:
+            if self._vault_file_paths_by_name is not None:
+                paths = self._vault_file_paths_by_name.get(os.path.normcase(path.name), [])
+                if path in paths:
+                    paths.remove(path)
+
+    def check_is_vault_file(self, path: Path) -> bool:
+        normcased_path = os.path.normcase(path)
+        return any(
+            os.path.normcase(vault_file_path) == normcased_path
+            for vault_file_path in self._get_vault_file_paths_with_name(name=path.name)
+        )
+
     def media_paths_from_file_text(self, file_text: str, note_path: Path) -> List["ReferencedVaultFile"]:
         media_paths = self._referenced_vault_files_from_file_text(
             file_text=file_text,
@@ -75,6 +116,7 @@ class ObsidianReferencesManager:
         ):
             obsidian_media_path.parent.mkdir(parents=True, exist_ok=True)
             shutil.copyfile(src=reference.path, dst=obsidian_media_path)
+            self.register_vault_file(path=obsidian_media_path)
 
         return obsidian_media_path
 
@@ -119,13 +161,19 @@ class ObsidianReferencesManager:
         allow_location_identifiers_only: bool = False,
     ) -> List["ReferencedVaultFile"]:
         file_reference_pattern = self._build_reference_file_type_matcher(
-            file_suffixes=file_suffixes,
+            file_suffixes=tuple(file_suffixes),
             allow_location_identifiers=allow_location_identifiers,
             allow_location_identifiers_only=allow_location_identifiers_only,
         )
         vault_file_paths = []
+        references_matches = (  # the references can only be in the links of the field
+            reference_match
+            for token in tokenize_field_text(field_text=file_text)
+            if token.kind == LINK_FIELD_TOKEN
+            for reference_match in file_reference_pattern.findall(token.text)
+        )
 
-        for quoted_path_string, location_identifier, _ in re.findall(file_reference_pattern, file_text, re.DOTALL):
+        for quoted_path_string, location_identifier, _ in references_matches:
             path_string = urllib.parse.unquote(string=quoted_path_string) if quoted_path_string else str(note_path)
             file_path = self._resolve_vault_file_reference_path(
                 base_path=Path(path_string), note_path=note_path
@@ -152,21 +200,52 @@ class ObsidianReferencesManager:
         sanitized_path = Path(self._sanitize_path_string(path_string=str(base_path)))
 
         if sanitized_path.name == str(sanitized_path):
-            if (note_path / sanitized_path.name).exists():
-                media_path = note_path / sanitized_path
-            else:
-                try:
-                    media_path = next(
-                        self._addon_config.obsidian_vault_path.rglob(pattern=str(sanitized_path))
-                    )
-                except StopIteration:  # does not exist in Obsidian
-                    default_media_folder = self._get_default_attachment_folder(note_path=note_path)
-                    media_path = default_media_folder / sanitized_path
+            vault_file_paths = self._get_vault_file_paths_with_name(name=sanitized_path.name)
+            if note_path.parent / sanitized_path in vault_file_paths:
+                media_path = note_path.parent / sanitized_path
+            elif len(vault_file_paths) != 0:
+                media_path = vault_file_paths[0]
+            else:  # does not exist in Obsidian
+                default_media_folder = self._get_default_attachment_folder(note_path=note_path)
+                media_path = default_media_folder / sanitized_path
         else:  # path relative to vault directory
             media_path = self._addon_config.obsidian_vault_path / sanitized_path
 
         return media_path
 
+    def _get_vault_file_paths_with_name(self, name: str) -> List[Path]:
+        with self._vault_file_paths_lock:
+            if self._cache_vault_file_paths:
+                if self._vault_file_paths_by_name is None:
+                    self._vault_file_paths_by_name = self._build_vault_file_paths_by_name()
+                vault_file_paths_by_name = self._vault_file_paths_by_name
+            else:
+                vault_file_paths_by_name = self._build_vault_file_paths_by_name()
+            return list(vault_file_paths_by_name.get(os.path.normcase(name), []))
+
+    def _build_vault_file_paths_by_name(self) -> Dict[str, List[Path]]:
+        """Like Obsidian, the hidden folders (e.g. `.obsidian` and `.trash`) are not indexed."""
+        vault_file_paths_by_name = {}
+        folder_paths = [self._addon_config.obsidian_vault_path]
+
+        while folder_paths:
+            folder_path = folder_paths.pop()
+            try:
+                with os.scandir(folder_path) as entries:
+                    for entry in entries:
+                        if entry.name.startswith("."):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            folder_paths.append(Path(entry.path))
+                        else:
+                            vault_file_paths_by_name.setdefault(os.path.normcase(entry.name), []).append(
+                                Path(entry.path)
+                            )
+            except OSError:
+                continue
+
+        return vault_file_paths_by_name
+
     @staticmethod
     def _sanitize_path_string(path_string: str) -> str:
         path_string = "".join(   # Replace all non-standard spaces and whitespace
@@ -179,11 +258,12 @@ class ObsidianReferencesManager:
         return self._obsidian_config.srs_attachments_folder
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def _build_reference_file_type_matcher(
-        file_suffixes: List[str],
+        file_suffixes: Tuple[str, ...],
         allow_location_identifiers: bool,
         allow_location_identifiers_only: bool = False,  # for referencing a section or block in the current file
-    ) -> str:
+    ) -> Pattern:
         assert not allow_location_identifiers_only or allow_location_identifiers
 
         square_brackets_piece = r"!?\[[^\]]*\]"
@@ -198,7 +278,7 @@ class ObsidianReferencesManager:
             rf"""{square_brackets_piece}\({file_matcher}{location_matcher}\s*{comment_piece_matcher}\s*\)"""
         )
 
-        return matcher
+        return re.compile(matcher, re.DOTALL)
 
 
 @dataclass
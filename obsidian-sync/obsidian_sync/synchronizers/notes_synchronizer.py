@@ -30,17 +30,19 @@
 
 import logging
 import time
-from dataclasses import dataclass
-from itertools import chain
-from typing import Set, Optional
+from dataclasses import dataclass, asdict
+from typing import Set, Optional, List
 
 from obsidian_sync.addon_config import AddonConfig
 from obsidian_sync.addon_metadata import AddonMetadata
 from obsidian_sync.anki.anki_notes_result import AnkiNotesResult
 from obsidian_sync.anki.app.anki_app import AnkiApp
 from obsidian_sync.anki.anki_note import AnkiNote
-from obsidian_sync.constants import ADD_ON_NAME, OBSIDIAN_LINK_URL_FIELD_NAME
-from obsidian_sync.markup_translator import MarkupTranslator
+from obsidian_sync.constants import ADD_ON_NAME, OBSIDIAN_LINK_URL_FIELD_NAME, MARKUP_TRANSLATION_CACHE_PATH, \
+    NEW_NOTES_TRANSLATION_BATCH_SIZE, SANITIZE_HTML_TRANSLATION, HTML_TO_MARKDOWN_TRANSLATION, \
+    SANITIZE_MARKDOWN_TRANSLATION, MARKDOWN_TO_HTML_TRANSLATION, SYNC_REPORTS_PATH, SYNC_REPORTS_MAX_COUNT
+from obsidian_sync.logging.sync_report import SyncReport
+from obsidian_sync.markup_translator import get_markup_translator, get_markup_translation_cache
 from obsidian_sync.obsidian.obsidian_config import ObsidianConfig
 from obsidian_sync.obsidian.obsidian_note import ObsidianNote
 from obsidian_sync.obsidian.obsidian_notes_manager import ObsidianNotesManager
@@ -78,7 +80,9 @@ class NotesSynchronizer:
             obsidian_vault=obsidian_vault,
             metadata=self._metadata,
         )
-        self._markup_translator = MarkupTranslator()
+
+    def stop_watching_vault(self):
+        self._obsidian_notes_manager.stop_watching_vault()
 
     def synchronize_notes(self):
         try:
@@ -86,8 +90,18 @@ class NotesSynchronizer:
             if time.time() < self._metadata.last_sync_timestamp:
                 time.sleep(1)
             sync_count = SyncCount()
-            obsidian_notes = self._obsidian_notes_manager.get_all_notes_categorized()
-            anki_notes = self._anki_app.get_all_notes_categorized()
+            sync_report = SyncReport()
+            markup_translation_cache = get_markup_translation_cache()
+            markup_translation_cache.load(
+                database_path=MARKUP_TRANSLATION_CACHE_PATH,
+                max_disk_size_mb=self._addon_config.markup_translation_cache_size_mb,
+            )
+            with sync_report.time_phase(name="vault scan") as phase:
+                obsidian_notes = self._obsidian_notes_manager.get_all_notes_categorized()
+                phase.item_count = obsidian_notes.all_notes_count
+            with sync_report.time_phase(name="Anki categorization") as phase:
+                anki_notes = self._anki_app.get_all_notes_categorized()
+                phase.item_count = anki_notes.all_notes_count
 
             unchanged_obsidian_note_ids = set(obsidian_notes.unchanged_notes.keys())
             non_new_obsidian_note_ids = unchanged_obsidian_note_ids.union(obsidian_notes.updated_notes.keys())
@@ -124,42 +138,77 @@ class NotesSynchronizer:
                     abort_sync = True
 
             if not abort_sync:
-                self._add_new_anki_notes(anki_notes=anki_notes, obsidian_notes=obsidian_notes, sync_count=sync_count)
-                self._add_new_obsidian_notes(obsidian_notes=obsidian_notes, sync_count=sync_count)
-                self._remove_deleted_notes(
-                    obsidian_notes=obsidian_notes,
-                    notes_deleted_in_anki=notes_deleted_in_anki,
-                    notes_deleted_in_obsidian=notes_deleted_in_obsidian,
-                    sync_count=sync_count,
+                self._anki_app.start_undo_entry(name=f"{ADD_ON_NAME} Sync")
+                try:
+                    with sync_report.time_phase(name="new Anki notes") as phase:
+                        phase.item_count = len(anki_notes.new_notes)
+                        self._add_new_anki_notes(
+                            anki_notes=anki_notes, obsidian_notes=obsidian_notes, sync_count=sync_count
+                        )
+                    with sync_report.time_phase(name="new Obsidian notes") as phase:
+                        phase.item_count = len(obsidian_notes.new_notes)
+                        self._add_new_obsidian_notes(obsidian_notes=obsidian_notes, sync_count=sync_count)
+                    with sync_report.time_phase(name="deletions") as phase:
+                        phase.item_count = len(notes_deleted_in_anki) + len(notes_deleted_in_obsidian)
+                        self._remove_deleted_notes(
+                            obsidian_notes=obsidian_notes,
+                            notes_deleted_in_anki=notes_deleted_in_anki,
+                            notes_deleted_in_obsidian=notes_deleted_in_obsidian,
+                            sync_count=sync_count,
+                        )
+                    with sync_report.time_phase(name="changed notes") as phase:
+                        phase.item_count = len(anki_notes.updated_notes.keys() | obsidian_notes.updated_notes.keys())
+                        self._synchronize_changed_notes(
+                            anki_notes=anki_notes, obsidian_notes=obsidian_notes, sync_count=sync_count
+                        )
+
+                    if self._addon_config.add_obsidian_url_in_anki:
+                        with sync_report.time_phase(name="Obsidian URLs") as phase:
+                            phase.item_count = self._ensure_anki_notes_have_obsidian_uri(
+                                obsidian_notes=obsidian_notes, anki_notes=anki_notes
+                            )
+                finally:
+                    self._anki_app.end_undo_entry()
+
+                with sync_report.time_phase(name="commit"):
+                    self._obsidian_notes_manager.commit_sync()
+                    markup_translation_cache.commit()
+                    self._metadata.commit_sync()
+
+                tip = (
+                    f"Synced {sync_count.new} new,"
+                    f" {sync_count.updated_in_anki} updated in Anki,"
+                    f" {sync_count.updated_in_obsidian} updated in Obsidian,"
+                    f" {sync_count.deleted} deleted,"
+                    f" and {sync_count.unchanged} unchanged notes successfully."
                 )
-                self._synchronize_changed_notes(
-                    anki_notes=anki_notes, obsidian_notes=obsidian_notes, sync_count=sync_count
-                )
-
-                if self._addon_config.add_obsidian_url_in_anki:
-                    self._ensure_anki_notes_have_obsidian_uri(obsidian_notes=obsidian_notes, anki_notes=anki_notes)
-
-                self._anki_app.show_tooltip(
-                    tip=format_add_on_message(
-                        f"Synced {sync_count.new} new,"
-                        f" {sync_count.updated_in_anki} updated in Anki,"
-                        f" {sync_count.updated_in_obsidian} updated in Obsidian,"
-                        f" {sync_count.deleted} deleted,"
-                        f" and {sync_count.unchanged} unchanged notes successfully."
+                if self._addon_config.show_sync_timing_in_tooltip:
+                    tip = f"{tip}\n{sync_report.to_summary()}"
+                self._anki_app.show_tooltip(tip=format_add_on_message(tip))
+                try:
+                    sync_report.save(
+                        path=SYNC_REPORTS_PATH, counts=asdict(sync_count), max_records=SYNC_REPORTS_MAX_COUNT
                     )
-                )
-                self._metadata.commit_sync()
+                except OSError:  # the sync is committed, failing to record its report must not fail it
+                    logging.exception("Failed to save the sync report.")
         except Exception as e:
             logging.exception("Failed to sync notes.")
             self._anki_app.show_critical(
                 text=format_add_on_message(f"Obsidian sync error: {str(e)}"),
                 title=ADD_ON_NAME,
             )
+        finally:
+            self._obsidian_notes_manager.end_sync()
 
     def _add_new_anki_notes(
         self, anki_notes: AnkiNotesResult, obsidian_notes: ObsidianNotesResult, sync_count: SyncCount
     ):
-        for anki_note in anki_notes.new_notes:
+        new_obsidian_notes = []
+        for i, anki_note in enumerate(anki_notes.new_notes):
+            if i % NEW_NOTES_TRANSLATION_BATCH_SIZE == 0:
+                self._translate_new_anki_notes_in_bulk(
+                    anki_notes=anki_notes.new_notes[i:i + NEW_NOTES_TRANSLATION_BATCH_SIZE]
+                )
             obsidian_note = (
                 obsidian_notes.unchanged_notes.pop(anki_note.id, None)
                 or obsidian_notes.updated_notes.pop(anki_note.id, None)
@@ -170,22 +219,57 @@ class NotesSynchronizer:
             obsidian_note = self._obsidian_notes_manager.create_new_obsidian_note_from_note(
                 reference_note=anki_note
             )
-            if self._addon_config.add_obsidian_url_in_anki:
-                self._update_anki_note_with_obsidian_notes(obsidian_note=obsidian_note, sanitize=False)
+            new_obsidian_notes.append(obsidian_note)
             sync_count.new += 1
+        if self._addon_config.add_obsidian_url_in_anki:
+            self._update_anki_notes_with_obsidian_notes(obsidian_notes=new_obsidian_notes, sanitize=False)
 
     def _add_new_obsidian_notes(self, obsidian_notes: ObsidianNotesResult, sync_count: SyncCount):
-        for obsidian_note in obsidian_notes.new_notes:
-            obsidian_note = self._sanitize_obsidian_note(obsidian_note=obsidian_note)
-            if obsidian_note is not None:
-                anki_note = self._anki_app.create_new_note_in_anki_from_note(
-                    note=obsidian_note, deck_name=self._addon_config.anki_deck_name_for_obsidian_imports
-                )
+        for i in range(0, len(obsidian_notes.new_notes), NEW_NOTES_TRANSLATION_BATCH_SIZE):
+            new_obsidian_notes = obsidian_notes.new_notes[i:i + NEW_NOTES_TRANSLATION_BATCH_SIZE]
+            self._translate_new_obsidian_notes_in_bulk(obsidian_notes=new_obsidian_notes)
+            new_obsidian_notes = self._sanitize_obsidian_notes(obsidian_notes=new_obsidian_notes)
+            anki_notes = self._anki_app.create_new_notes_in_anki_from_notes(
+                notes=new_obsidian_notes, deck_name=self._addon_config.anki_deck_name_for_obsidian_imports
+            )
+            for obsidian_note, anki_note in zip(new_obsidian_notes, anki_notes):
                 self._obsidian_notes_manager.update_obsidian_note_with_note(  # update note ID and timestamps
                     obsidian_note=obsidian_note, reference_note=anki_note
                 )
                 sync_count.new += 1
 
+    def _translate_new_anki_notes_in_bulk(self, anki_notes: List[AnkiNote]):
+        """Runs the translations needed to add the new Anki notes to Obsidian in batches, so that they
+        are then read from the translations cache."""
+        process_count = self._addon_config.markup_translation_process_count
+        if process_count > 1:
+            markup_translator = get_markup_translator()
+            sanitized_field_htmls = markup_translator.translate_many(
+                texts=[field.to_html() for anki_note in anki_notes for field in anki_note.content.fields],
+                translation=SANITIZE_HTML_TRANSLATION,
+                process_count=process_count,
+            )
+            markup_translator.translate_many(
+                texts=sanitized_field_htmls, translation=HTML_TO_MARKDOWN_TRANSLATION, process_count=process_count
+            )
+
+    def _translate_new_obsidian_notes_in_bulk(self, obsidian_notes: List[ObsidianNote]):
+        """Runs the translations needed to add the new Obsidian notes to Anki in batches, so that they
+        are then read from the translations cache."""
+        process_count = self._addon_config.markup_translation_process_count
+        if process_count > 1:
+            markup_translator = get_markup_translator()
+            sanitized_field_markdowns = markup_translator.translate_many(
+                texts=[
+                    field.to_markdown() for obsidian_note in obsidian_notes for field in obsidian_note.content.fields
+                ],
+                translation=SANITIZE_MARKDOWN_TRANSLATION,
+                process_count=process_count,
+            )
+            markup_translator.translate_many(
+                texts=sanitized_field_markdowns, translation=MARKDOWN_TO_HTML_TRANSLATION, process_count=process_count
+            )
+
     def _remove_deleted_notes(
         self,
         obsidian_notes: ObsidianNotesResult,
@@ -193,16 +277,15 @@ class NotesSynchronizer:
         notes_deleted_in_obsidian: Set[int],
         sync_count: SyncCount,
     ):
-        for note_id in notes_deleted_in_anki:
-            obsidian_note = (
-                obsidian_notes.unchanged_notes.pop(note_id, None)
-                or obsidian_notes.updated_notes.pop(note_id)
-            )
-            self._obsidian_notes_manager.delete_note(note=obsidian_note)
-            sync_count.deleted += 1
-        for note_id in notes_deleted_in_obsidian:
-            self._anki_app.delete_note_by_id(note_id=note_id)
-            sync_count.deleted += 1
+        obsidian_notes_to_delete = [
+            obsidian_notes.unchanged_notes.pop(note_id, None) or obsidian_notes.updated_notes.pop(note_id)
+            for note_id in notes_deleted_in_anki
+        ]
+        self._obsidian_notes_manager.delete_notes(notes=obsidian_notes_to_delete)
+        sync_count.deleted += len(obsidian_notes_to_delete)
+        if notes_deleted_in_obsidian:
+            self._anki_app.delete_notes_by_ids(note_ids=list(notes_deleted_in_obsidian))
+            sync_count.deleted += len(notes_deleted_in_obsidian)
 
     def _synchronize_changed_notes(
         self, anki_notes: AnkiNotesResult, obsidian_notes: ObsidianNotesResult, sync_count: SyncCount
@@ -233,6 +316,7 @@ class NotesSynchronizer:
             sync_count.updated_in_obsidian += 1
 
         changes_in_obsidian_only = changes_in_obsidian - changes_in_both_systems
+        obsidian_notes_to_update_in_anki = []
         for note_id in changes_in_obsidian_only:
             anki_note = anki_notes.unchanged_notes.get(note_id, None)
             obsidian_note = obsidian_notes.updated_notes[note_id]
@@ -251,19 +335,20 @@ class NotesSynchronizer:
             else:
                 if obsidian_note.is_corrupt():
                     obsidian_note = self._fix_corrupted_obsidian_note(obsidian_note=obsidian_note, anki_note=anki_note)
-                self._update_anki_note_with_obsidian_notes(obsidian_note=obsidian_note)
+                obsidian_notes_to_update_in_anki.append(obsidian_note)
                 sync_count.updated_in_anki += 1
+        self._update_anki_notes_with_obsidian_notes(obsidian_notes=obsidian_notes_to_update_in_anki)
 
     def _synchronize_note_pair(self, anki_note: AnkiNote, obsidian_note: ObsidianNote):
         self._obsidian_notes_manager.update_obsidian_note_with_note(  # Anki takes precedence because off-loading and re-downloading Obsidian files synced with iCloud updates their last-modified timestamp
             obsidian_note=obsidian_note, reference_note=anki_note,
         )
 
-    def _update_anki_note_with_obsidian_notes(self, obsidian_note: ObsidianNote, sanitize: bool = True):
+    def _update_anki_notes_with_obsidian_notes(self, obsidian_notes: List[ObsidianNote], sanitize: bool = True):
         if sanitize:
-            obsidian_note = self._sanitize_obsidian_note(obsidian_note=obsidian_note)
-        if obsidian_note is not None:
-            anki_note = self._anki_app.update_anki_note_with_note(reference_note=obsidian_note)
+            obsidian_notes = self._sanitize_obsidian_notes(obsidian_notes=obsidian_notes)
+        anki_notes = self._anki_app.update_anki_notes_with_notes(reference_notes=obsidian_notes)
+        for obsidian_note, anki_note in zip(obsidian_notes, anki_notes):
             self._obsidian_notes_manager.update_obsidian_note_with_note(  # update timestamps
                 obsidian_note=obsidian_note, reference_note=anki_note
             )
@@ -273,7 +358,7 @@ class NotesSynchronizer:
 
         for field in anki_note.content.fields:
             original_field_html = field.to_html()
-            sanitized_field_html = self._markup_translator.sanitize_html(html=original_field_html)
+            sanitized_field_html = get_markup_translator().sanitize_html(html=original_field_html)
             if sanitized_field_html != original_field_html:
                 field.set_from_html(html=sanitized_field_html)
                 refactored = True
@@ -283,12 +368,21 @@ class NotesSynchronizer:
 
         return anki_note
 
+    def _sanitize_obsidian_notes(self, obsidian_notes: List[ObsidianNote]) -> List[ObsidianNote]:
+        """The notes that fail parsing are left out."""
+        sanitized_obsidian_notes = []
+        for obsidian_note in obsidian_notes:
+            obsidian_note = self._sanitize_obsidian_note(obsidian_note=obsidian_note)
+            if obsidian_note is not None:
+                sanitized_obsidian_notes.append(obsidian_note)
+        return sanitized_obsidian_notes
+
     def _sanitize_obsidian_note(self, obsidian_note: ObsidianNote) -> Optional[ObsidianNote]:
         refactored = False
 
         try:
             for field in obsidian_note.content.fields:
-                sanitized_field_markdown = self._markup_translator.sanitize_markdown(markdown=field.to_markdown())
+                sanitized_field_markdown = get_markup_translator().sanitize_markdown(markdown=field.to_markdown())
                 if field.to_markdown() != sanitized_field_markdown:
                     field.set_from_markdown(markdown=sanitized_field_markdown)
                     refactored = True
@@ -307,21 +401,25 @@ class NotesSynchronizer:
 
         return obsidian_note
 
-    def _ensure_anki_notes_have_obsidian_uri(self, anki_notes: AnkiNotesResult, obsidian_notes: ObsidianNotesResult):
-        for note_id, anki_note in chain(anki_notes.updated_notes.items(), anki_notes.unchanged_notes.items()):
-            has_obsidian_uri = any(
-                field.name == OBSIDIAN_LINK_URL_FIELD_NAME
-                and not len(field.text) == 0
-                for field in anki_note.content.fields
-            )
-            if not has_obsidian_uri:
+    def _ensure_anki_notes_have_obsidian_uri(
+        self, anki_notes: AnkiNotesResult, obsidian_notes: ObsidianNotesResult
+    ) -> int:
+        """The notes missing the URL are found with a search so that the unchanged notes are not loaded.
+
+        Returns the number of updated notes."""
+        obsidian_notes_missing_url = []
+        for note_id in self._anki_app.find_note_ids_with_empty_field(field_name=OBSIDIAN_LINK_URL_FIELD_NAME):
+            anki_note = anki_notes.updated_notes.get(note_id, None) or anki_notes.unchanged_notes.get(note_id, None)
+            if anki_note is not None:
                 obsidian_note = (
                     obsidian_notes.unchanged_notes.get(note_id, None)
                     or obsidian_notes.updated_notes[note_id]
                 )
                 if obsidian_note.is_corrupt():
                     obsidian_note = self._fix_corrupted_obsidian_note(obsidian_note=obsidian_note, anki_note=anki_note)
-                self._anki_app.update_anki_note_with_note(reference_note=obsidian_note)
+                obsidian_notes_missing_url.append(obsidian_note)
+        self._anki_app.update_anki_notes_with_notes(reference_notes=obsidian_notes_missing_url)
+        return len(obsidian_notes_missing_url)
 
     def _fix_corrupted_obsidian_note(self, obsidian_note: ObsidianNote, anki_note: AnkiNote) -> ObsidianNote:
         self._obsidian_notes_manager.delete_note(note=obsidian_note)
@@ -3,6 +3,10 @@ from pathlib import Path
 
 from obsidian_sync.addon_config import AddonConfig
 from obsidian_sync.addon_metadata import AddonMetadata
+from obsidian_sync.anki.anki_content import LazyAnkiNoteField
+from obsidian_sync.anki.anki_note import LazyAnkiNote
+from obsidian_sync.anki.app import anki_app as anki_app_module
+from obsidian_sync.anki.app.anki_media_manager import AnkiReferencesManager
 from tests.anki_test_app import AnkiTestApp
 from tests.utils import build_basic_anki_note
 
@@ -84,3 +88,123 @@ def test_get_note_changes_method_ignores_unchanged_note(
     assert len(note_changes.new_notes) == 0
     assert len(note_changes.updated_notes) == 0
     assert len(note_changes.unchanged_notes) == 1
+
+
+def test_get_note_changes_method_loads_notes_identical_to_individually_loaded_notes(
+    anki_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    addon_metadata: AddonMetadata,
+):
+    note = build_basic_anki_note(
+        anki_test_app=anki_test_app,
+        front_text="Some <b>front</b>",
+        back_text="Some back",
+        tags=["some-tag", "another::tag"],
+    )
+    note = anki_test_app.add_note(
+        note=note, deck_name=addon_config.anki_deck_name_for_obsidian_imports
+    )
+
+    note_changes = anki_test_app.get_all_notes_categorized()
+
+    assert note_changes.new_notes == [anki_test_app.get_note_by_id(note_id=note.id)]
+
+
+def test_get_note_changes_method_loads_unchanged_notes_on_access(
+    anki_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    addon_metadata: AddonMetadata,
+):
+    note = build_basic_anki_note(
+        anki_test_app=anki_test_app,
+        front_text="Some front",
+        back_text="Some back",
+    )
+    note = anki_test_app.add_note(
+        note=note, deck_name=addon_config.anki_deck_name_for_obsidian_imports
+    )
+
+    addon_metadata._last_sync_timestamp = int(time.time()) + 1
+    note_changes = anki_test_app.get_all_notes_categorized()
+    unchanged_note = note_changes.unchanged_notes[note.id]
+
+    assert isinstance(unchanged_note, LazyAnkiNote)
+    assert unchanged_note.id == note.id
+    assert unchanged_note == note
+
+
+def test_update_anki_notes_with_notes_in_chunks(
+    anki_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    monkeypatch,
+):
+    monkeypatch.setattr(anki_app_module, "ANKI_NOTES_WRITE_CHUNK_SIZE", 2)
+    notes = []
+    for i in range(3):
+        note = build_basic_anki_note(
+            anki_test_app=anki_test_app,
+            front_text=f"Some front {i}",
+            back_text="Some back",
+        )
+        notes.append(anki_test_app.add_note(note=note, deck_name=addon_config.anki_deck_name_for_obsidian_imports))
+    for i, note in enumerate(notes):
+        note.content.properties.tags.append(f"tag-{i}")
+
+    anki_test_app.start_undo_entry(name="Some sync")
+    updated_notes = anki_test_app.update_anki_notes_with_notes(reference_notes=list(reversed(notes)))
+    anki_test_app.end_undo_entry()
+
+    assert [note.id for note in updated_notes] == [note.id for note in reversed(notes)]
+    for i, note in enumerate(notes):
+        updated_note = updated_notes[len(notes) - 1 - i]
+        assert updated_note == anki_test_app.get_note_by_id(note_id=note.id)
+        assert not isinstance(updated_note.content.fields[0], LazyAnkiNoteField)  # built from the written content
+        assert f"tag-{i}" in updated_note.content.properties.tags
+
+
+def test_create_new_notes_in_anki_from_notes_in_chunks(
+    anki_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    monkeypatch,
+):
+    monkeypatch.setattr(anki_app_module, "ANKI_NOTES_WRITE_CHUNK_SIZE", 2)
+    notes = [
+        build_basic_anki_note(
+            anki_test_app=anki_test_app,
+            front_text=f"Some front {i}",
+            back_text="Some back",
+            tags=[f"tag-{i}"],
+        )
+        for i in range(3)
+    ]
+
+    anki_notes = anki_test_app.create_new_notes_in_anki_from_notes(
+        notes=notes, deck_name=addon_config.anki_deck_name_for_obsidian_imports
+    )
+
+    assert len(anki_notes) == 3
+    for i, (note, anki_note) in enumerate(zip(notes, anki_notes)):
+        assert note.content.properties.note_id == anki_note.id
+        assert anki_note == anki_test_app.get_note_by_id(note_id=anki_note.id)
+        assert anki_note.content.properties.tags == [f"tag-{i}"]
+        assert anki_note.content.fields[0].to_html() == f"Some front {i}"
+
+
+def test_get_obsidian_urls_from_card_field_text():
+    field_text = (
+        '<p>Some text with <a href="https://example.com">a link</a>'
+        ' and <a href="obsidian://open?vault=vault&amp;file=note.md">an Obsidian link</a></p>'
+        "<A HREF='obsidian&#58;//open?vault=vault&amp;file=other.md'>another Obsidian link</A>"
+    )
+
+    obsidian_urls = AnkiReferencesManager.get_obsidian_urls_from_card_field_text(field_text=field_text)
+
+    assert obsidian_urls == [
+        "obsidian://open?vault=vault&file=note.md",
+        "obsidian://open?vault=vault&file=other.md",
+    ]
+    assert AnkiReferencesManager.get_obsidian_urls_from_card_field_text(field_text="<p>No links</p>") == []
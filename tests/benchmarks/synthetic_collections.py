@@ -0,0 +1,123 @@
+import random
+from pathlib import Path
+from typing import List, Tuple
+
+import aqt
+from PIL import Image as PILImage
+
+from obsidian_sync.anki.anki_content import AnkiMediaReference
+from obsidian_sync.constants import MARKDOWN_FILE_SUFFIX
+from obsidian_sync.markup_translator import MarkupTranslator
+from tests.anki_test_app import AnkiTestApp
+from tests.utils import build_basic_anki_note, build_anki_cloze_note, build_basic_obsidian_note, \
+    build_obsidian_cloze_note
+
+BENCHMARK_IMAGE_FILE_NAME = "benchmark-image.png"
+WORDS = [
+    "memory", "retrieval", "practice", "spaced", "repetition", "interval", "neuron", "synapse", "protein",
+    "function", "integral", "derivative", "matrix", "vector", "theorem", "proof", "history", "treaty",
+]
+
+
+def build_synthetic_note_texts(note_index: int, rng: random.Random) -> Tuple[str, str, bool]:
+    """Returns the Markdown texts of a note and whether it is a cloze note.
+
+    The mix roughly follows real collections: mostly plain text with some formatting, LaTeX, media,
+    links and clozes.
+    """
+    front = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))).capitalize()
+    back = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+    kind = note_index % 10
+    if kind == 1:
+        back = f"Some **{back}** with *emphasis*"
+    elif kind == 2:
+        back = f"{back} with the formula $x_{{{note_index}}}^2 + y = \\frac{{a}}{{b}}$"
+    elif kind == 3:
+        back = f"{back}\n\n$$\\int_0^{{{note_index}}} f(x) dx$$"
+    elif kind == 4:
+        back = f"{back}\n\n![]({BENCHMARK_IMAGE_FILE_NAME})"
+    elif kind == 5:
+        back = f"{back} and a [link](https://example.com/{note_index})"
+    elif kind == 6:
+        back = f"- {back}\n- {rng.choice(WORDS)}\n- {rng.choice(WORDS)}"
+    is_cloze = kind in (7, 8)
+    if is_cloze:
+        front = f"{front} {{{{c1::{rng.choice(WORDS)}}}}} and {{{{c2::{rng.choice(WORDS)}}}}}"
+    return front, back, is_cloze
+
+
+def add_synthetic_anki_notes(
+    anki_test_app: AnkiTestApp,
+    markup_translator: MarkupTranslator,
+    deck_name: str,
+    note_count: int,
+    image_path: Path,
+    seed: int,
+):
+    image_reference = AnkiMediaReference(path=image_path)
+    image_reference.path = anki_test_app.media_manager.ensure_media_is_in_anki(reference=image_reference)
+    rng = random.Random(seed)
+    for note_index in range(note_count):
+        front, back, is_cloze = build_synthetic_note_texts(note_index=note_index, rng=rng)
+        references = [image_reference] if BENCHMARK_IMAGE_FILE_NAME in back else []
+        back_html = markup_translator.translate_markdown_to_html(markdown=back)
+        if is_cloze:
+            note = build_anki_cloze_note(
+                anki_test_app=anki_test_app,
+                text=markup_translator.translate_markdown_to_html(markdown=front),
+                references=references,
+            )
+            note.content.fields[1].text = back_html
+        else:
+            note = build_basic_anki_note(
+                anki_test_app=anki_test_app,
+                front_text=markup_translator.translate_markdown_to_html(markdown=front),
+                back_text=back_html,
+                back_references=references,
+            )
+        anki_test_app.add_note(note=note, deck_name=deck_name)
+
+
+def add_synthetic_obsidian_notes(
+    anki_test_app: AnkiTestApp,
+    srs_folder_in_obsidian: Path,
+    srs_attachments_in_obsidian_folder: Path,
+    note_count: int,
+    image: PILImage,
+    seed: int,
+):
+    srs_attachments_in_obsidian_folder.mkdir(parents=True, exist_ok=True)
+    image.save(srs_attachments_in_obsidian_folder / BENCHMARK_IMAGE_FILE_NAME)
+    rng = random.Random(seed)
+    for note_index in range(note_count):
+        front, back, is_cloze = build_synthetic_note_texts(note_index=note_index, rng=rng)
+        file_path = srs_folder_in_obsidian / f"folder {note_index % 20}" / f"note {note_index}{MARKDOWN_FILE_SUFFIX}"
+        if is_cloze:
+            build_obsidian_cloze_note(anki_test_app=anki_test_app, text=f"{front}\n\n{back}", file_path=file_path)
+        else:
+            build_basic_obsidian_note(
+                anki_test_app=anki_test_app, front_text=front, back_text=back, file_path=file_path
+            )
+
+
+def edit_anki_notes(note_ids: List[int]):
+    col = aqt.mw.col
+    for note_id in note_ids:
+        note = col.get_note(note_id)
+        note.fields[0] = f"{note.fields[0]} edited"
+        col.update_note(note)
+
+
+def edit_obsidian_notes(note_paths: List[Path]):
+    for note_path in note_paths:
+        note_text = note_path.read_text()
+        note_path.write_text(f"{note_text.rstrip()} edited\n\n")
+
+
+def delete_anki_notes(note_ids: List[int]):
+    aqt.mw.col.remove_notes(note_ids)
+
+
+def delete_obsidian_notes(note_paths: List[Path]):
+    for note_path in note_paths:
+        note_path.unlink()
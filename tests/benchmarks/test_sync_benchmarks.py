@@ -0,0 +1,139 @@
+"""End-to-end sync benchmarks on synthetic collections.
+
+They are skipped unless OBSIDIAN_SYNC_BENCHMARK_SIZES lists the note counts to benchmark, e.g.
+
+    OBSIDIAN_SYNC_BENCHMARK_SIZES=1000,10000,50000 pytest tests/benchmarks
+
+The timings are written as JSON to OBSIDIAN_SYNC_BENCHMARK_RESULTS (a temporary file by default). If
+OBSIDIAN_SYNC_BENCHMARK_BASELINE points to the results of a previous run, each timing is compared with
+it and the benchmark fails for the scenarios slower than OBSIDIAN_SYNC_BENCHMARK_MAX_SLOWDOWN times
+(1.25 by default) their baseline.
+"""
+
+import json
+import os
+import platform
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Callable
+
+import aqt
+import pytest
+from PIL import Image as PILImage
+
+from obsidian_sync.addon_config import AddonConfig
+from obsidian_sync.constants import MARKDOWN_FILE_SUFFIX
+from obsidian_sync.markup_translator import MarkupTranslator
+from obsidian_sync.synchronizers.notes_synchronizer import NotesSynchronizer
+from tests.anki_test_app import AnkiTestApp
+from tests.benchmarks.synthetic_collections import add_synthetic_anki_notes, add_synthetic_obsidian_notes, \
+    edit_anki_notes, edit_obsidian_notes, delete_anki_notes, delete_obsidian_notes
+
+BENCHMARK_SIZES = [int(size) for size in os.environ.get("OBSIDIAN_SYNC_BENCHMARK_SIZES", "").split(",") if size]
+RESULTS_PATH = Path(
+    os.environ.get("OBSIDIAN_SYNC_BENCHMARK_RESULTS", Path(tempfile.gettempdir()) / "obsidian-sync-benchmarks.json")
+)
+BASELINE_PATH = os.environ.get("OBSIDIAN_SYNC_BENCHMARK_BASELINE")
+MAX_SLOWDOWN = float(os.environ.get("OBSIDIAN_SYNC_BENCHMARK_MAX_SLOWDOWN", "1.25"))
+EDITED_NOTES_SHARE = 0.01
+DELETED_NOTES_SHARE = 0.05  # stays below the share that prompts for a confirmation
+
+_results = {"platform": platform.platform(), "python": platform.python_version(), "benchmarks": {}}
+
+
+@pytest.mark.skipif(not BENCHMARK_SIZES, reason="OBSIDIAN_SYNC_BENCHMARK_SIZES is not set")
+@pytest.mark.parametrize("note_count", BENCHMARK_SIZES or [0])
+def test_sync_benchmarks(
+    anki_setup_and_teardown,
+    obsidian_setup_and_teardown,
+    tmp_path: Path,
+    note_count: int,
+    anki_test_app: AnkiTestApp,
+    markup_translator: MarkupTranslator,
+    addon_config: AddonConfig,
+    some_test_image: PILImage,
+    srs_folder_in_obsidian: Path,
+    srs_attachments_in_obsidian_folder: Path,
+    notes_synchronizer: NotesSynchronizer,
+):
+    image_path = tmp_path / "benchmark-image.png"
+    some_test_image.save(image_path)
+    add_synthetic_anki_notes(
+        anki_test_app=anki_test_app,
+        markup_translator=markup_translator,
+        deck_name=addon_config.anki_deck_name_for_obsidian_imports,
+        note_count=note_count // 2,
+        image_path=image_path,
+        seed=note_count,
+    )
+    add_synthetic_obsidian_notes(
+        anki_test_app=anki_test_app,
+        srs_folder_in_obsidian=srs_folder_in_obsidian,
+        srs_attachments_in_obsidian_folder=srs_attachments_in_obsidian_folder,
+        note_count=note_count - note_count // 2,
+        image=some_test_image,
+        seed=note_count + 1,
+    )
+    timings = {}
+
+    timings["cold_sync"] = _time_sync(notes_synchronizer=notes_synchronizer)
+    timings["no_op_sync"] = _time_sync(notes_synchronizer=notes_synchronizer)
+
+    edited_notes_count = max(1, int(note_count * EDITED_NOTES_SHARE / 2))
+    timings["edits_sync"] = _time_sync(
+        notes_synchronizer=notes_synchronizer,
+        before_sync=lambda: (
+            edit_anki_notes(note_ids=list(aqt.mw.col.find_notes(""))[:edited_notes_count]),
+            edit_obsidian_notes(
+                note_paths=_get_note_paths(srs_folder_in_obsidian=srs_folder_in_obsidian)[-edited_notes_count:]
+            ),
+        ),
+    )
+
+    deleted_notes_count = max(1, int(note_count * DELETED_NOTES_SHARE / 2))
+    timings["deletes_sync"] = _time_sync(
+        notes_synchronizer=notes_synchronizer,
+        before_sync=lambda: (
+            delete_anki_notes(note_ids=list(aqt.mw.col.find_notes(""))[:deleted_notes_count]),
+            delete_obsidian_notes(
+                note_paths=_get_note_paths(srs_folder_in_obsidian=srs_folder_in_obsidian)[-deleted_notes_count:]
+            ),
+        ),
+    )
+
+    regressions = _record_timings(note_count=note_count, timings=timings)
+
+    assert not regressions, f"Sync regressions compared with {BASELINE_PATH}: {regressions}"
+
+
+def _time_sync(notes_synchronizer: NotesSynchronizer, before_sync: Callable = None) -> float:
+    time.sleep(1)  # the sync timestamps have a one-second resolution
+    if before_sync is not None:
+        before_sync()
+    start = time.perf_counter()
+    notes_synchronizer.synchronize_notes()
+    return time.perf_counter() - start
+
+
+def _get_note_paths(srs_folder_in_obsidian: Path):
+    return sorted(srs_folder_in_obsidian.rglob(f"*{MARKDOWN_FILE_SUFFIX}"))
+
+
+def _record_timings(note_count: int, timings: Dict[str, float]) -> Dict[str, float]:
+    baseline = json.loads(Path(BASELINE_PATH).read_text())["benchmarks"] if BASELINE_PATH else {}
+    baseline_timings = baseline.get(str(note_count), {}).get("timings", {})
+
+    slowdowns = {
+        scenario: timing / baseline_timings[scenario]
+        for scenario, timing in timings.items()
+        if baseline_timings.get(scenario)
+    }
+    _results["benchmarks"][str(note_count)] = {
+        "timings": timings,
+        "baseline_timings": baseline_timings,
+        "slowdowns": slowdowns,
+    }
+    RESULTS_PATH.write_text(json.dumps(_results, indent=2))
+
+    return {scenario: slowdown for scenario, slowdown in slowdowns.items() if slowdown > MAX_SLOWDOWN}
@@ -28,6 +28,8 @@ from obsidian_sync.obsidian.obsidian_vault import ObsidianVault
 from obsidian_sync.synchronizers.notes_synchronizer import NotesSynchronizer
 from obsidian_sync.synchronizers.templates_synchronizer import TemplatesSynchronizer
 from obsidian_sync import addon_metadata as addon_metadata_module
+from obsidian_sync.obsidian import obsidian_vault_index as obsidian_vault_index_module
+from obsidian_sync.synchronizers import notes_synchronizer as notes_synchronizer_module
 from tests.anki_test_app import AnkiTestApp
 
 
@@ -337,6 +339,7 @@ def obsidian_notes_manager(
 
 @pytest.fixture()
 def obsidian_setup_and_teardown(
+    tmp_path: Path,
     srs_folder_in_obsidian: Path,
     obsidian_templates_folder: Path,
     srs_attachments_in_obsidian_folder: Path,
@@ -365,6 +368,11 @@ def obsidian_setup_and_teardown(
     with open(file=obsidian_settings_folder / OBSIDIAN_TEMPLATES_SETTINGS_FILE, mode="w") as f:
         json.dump(template_settings, f)
 
+    obsidian_vault_index_module.VAULT_INDEXES_PATH = tmp_path / obsidian_vault_index_module.VAULT_INDEXES_PATH.name
+    notes_synchronizer_module.MARKUP_TRANSLATION_CACHE_PATH = (
+        tmp_path / notes_synchronizer_module.MARKUP_TRANSLATION_CACHE_PATH.name
+    )
+    notes_synchronizer_module.SYNC_REPORTS_PATH = tmp_path / notes_synchronizer_module.SYNC_REPORTS_PATH.name
     addon_metadata._last_sync_timestamp = 0
 
     yield
@@ -1,11 +1,19 @@
+import sys
 import time
 from pathlib import Path
 
+import pytest
+
 from obsidian_sync.addon_config import AddonConfig
 from obsidian_sync.addon_metadata import AddonMetadata
+from obsidian_sync.constants import (
+    CONF_WATCH_VAULT_FOR_CHANGES, CONF_WRITE_OBSIDIAN_FILES_IN_BACKGROUND, OBSIDIAN_LOCAL_TRASH_OPTION_VALUE,
+    OBSIDIAN_LOCAL_TRASH_FOLDER, OBSIDIAN_PERMA_DELETE_TRASH_OPTION_VALUE
+)
+from obsidian_sync.obsidian.obsidian_config import ObsidianConfig
 from obsidian_sync.obsidian.obsidian_notes_manager import ObsidianNotesManager
 from tests.anki_test_app import AnkiTestApp
-from tests.utils import build_basic_obsidian_note
+from tests.utils import build_basic_obsidian_note, build_basic_anki_note
 
 
 def test_get_note_changes_method_finds_new_note(
@@ -115,3 +123,291 @@ def test_get_note_changes_method_finds_moved_note_identified_as_existing(
     assert len(notes.new_notes) == 0
     assert len(notes.updated_notes) == 1
     assert len(notes.unchanged_notes) == 0
+
+
+def test_get_note_changes_method_does_not_read_files_unchanged_since_index_commit(
+    anki_setup_and_teardown,
+    obsidian_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    addon_metadata: AddonMetadata,
+    srs_folder_in_obsidian: Path,
+    obsidian_notes_manager: ObsidianNotesManager,
+    monkeypatch,
+):
+    obsidian_note_path = srs_folder_in_obsidian / "test.md"
+    some_note_id = 1
+    build_basic_obsidian_note(
+        anki_test_app=anki_test_app,
+        front_text="Some front",
+        back_text="Some back",
+        file_path=obsidian_note_path,
+        mock_note_id=some_note_id,
+    )
+
+    obsidian_notes_manager.get_all_notes_categorized()
+    obsidian_notes_manager.commit_sync()
+
+    read_paths = []
+    original_read_text = Path.read_text
+
+    def read_text(self, *args, **kwargs):
+        read_paths.append(self)
+        return original_read_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "read_text", read_text)
+    addon_metadata._last_sync_timestamp = int(time.time()) + 1
+    notes = obsidian_notes_manager.get_all_notes_categorized()
+
+    assert obsidian_note_path not in read_paths
+    assert len(notes.unchanged_notes) == 1
+    assert some_note_id in notes.unchanged_notes
+
+
+def test_get_note_changes_method_ignores_touched_note_with_unchanged_content(
+    anki_setup_and_teardown,
+    obsidian_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    addon_metadata: AddonMetadata,
+    srs_folder_in_obsidian: Path,
+    obsidian_notes_manager: ObsidianNotesManager,
+):
+    obsidian_note_path = srs_folder_in_obsidian / "test.md"
+    some_note_id = 1
+    build_basic_obsidian_note(
+        anki_test_app=anki_test_app,
+        front_text="Some front",
+        back_text="Some back",
+        file_path=obsidian_note_path,
+        mock_note_id=some_note_id,
+    )
+
+    obsidian_notes_manager.get_all_notes_categorized()
+    obsidian_notes_manager.commit_sync()
+
+    addon_metadata._last_sync_timestamp = int(time.time()) - 1
+    time.sleep(1)
+    obsidian_note_path.touch()
+    notes = obsidian_notes_manager.get_all_notes_categorized()
+
+    assert len(notes.updated_notes) == 0
+    assert some_note_id in notes.unchanged_notes
+
+
+def test_get_note_changes_method_skips_notes_in_hidden_folders(
+    anki_setup_and_teardown,
+    obsidian_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    addon_metadata: AddonMetadata,
+    srs_folder_in_obsidian: Path,
+    obsidian_notes_manager: ObsidianNotesManager,
+):
+    hidden_folder = srs_folder_in_obsidian / ".hidden"
+    hidden_folder.mkdir(parents=True)
+    sub_folder = srs_folder_in_obsidian / "sub-folder"
+    sub_folder.mkdir(parents=True)
+    build_basic_obsidian_note(
+        anki_test_app=anki_test_app,
+        front_text="Some front",
+        back_text="Some back",
+        file_path=hidden_folder / "test.md",
+    )
+    build_basic_obsidian_note(
+        anki_test_app=anki_test_app,
+        front_text="Another front",
+        back_text="Another back",
+        file_path=sub_folder / "test.md",
+    )
+
+    notes = obsidian_notes_manager.get_all_notes_categorized()
+
+    assert len(notes.new_notes) == 1
+    assert notes.new_notes[0].file.path == sub_folder / "test.md"
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="The vault watcher uses inotify.")
+def test_get_note_changes_method_only_checks_files_changed_since_last_sync_when_watching_vault(
+    anki_setup_and_teardown,
+    obsidian_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    addon_metadata: AddonMetadata,
+    srs_folder_in_obsidian: Path,
+    obsidian_notes_manager: ObsidianNotesManager,
+    monkeypatch,
+):
+    anki_test_app.set_config_value(config_name=CONF_WATCH_VAULT_FOR_CHANGES, value=True)
+    unchanged_note_path = srs_folder_in_obsidian / "unchanged.md"
+    some_note_id = 1
+    build_basic_obsidian_note(
+        anki_test_app=anki_test_app,
+        front_text="Some front",
+        back_text="Some back",
+        file_path=unchanged_note_path,
+        mock_note_id=some_note_id,
+    )
+
+    obsidian_notes_manager.get_all_notes_categorized()  # the first sync scans the whole folder
+    obsidian_notes_manager.commit_sync()
+
+    addon_metadata._last_sync_timestamp = int(time.time()) + 1
+    build_basic_obsidian_note(
+        anki_test_app=anki_test_app,
+        front_text="Another front",
+        back_text="Another back",
+        file_path=srs_folder_in_obsidian / "new.md",
+    )
+    time.sleep(0.5)  # let the watcher process the events
+
+    stat_paths = []
+    original_stat = Path.stat
+
+    def stat(self, *args, **kwargs):
+        stat_paths.append(self)
+        return original_stat(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "stat", stat)
+    notes = obsidian_notes_manager.get_all_notes_categorized()
+
+    assert unchanged_note_path not in stat_paths
+    assert len(notes.new_notes) == 1
+    assert some_note_id in notes.unchanged_notes
+
+    anki_test_app.set_config_value(config_name=CONF_WATCH_VAULT_FOR_CHANGES, value=False)
+    obsidian_notes_manager.get_all_notes_categorized()  # stops the watcher
+
+
+def test_notes_written_in_background_are_indexed_on_commit(
+    anki_setup_and_teardown,
+    obsidian_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    addon_metadata: AddonMetadata,
+    obsidian_notes_manager: ObsidianNotesManager,
+    monkeypatch,
+):
+    anki_test_app.set_config_value(config_name=CONF_WRITE_OBSIDIAN_FILES_IN_BACKGROUND, value=True)
+    note = build_basic_anki_note(
+        anki_test_app=anki_test_app,
+        front_text="Some front",
+        back_text="Some back",
+    )
+    anki_note = anki_test_app.add_note(note=note, deck_name=addon_config.anki_deck_name_for_obsidian_imports)
+
+    obsidian_note = obsidian_notes_manager.create_new_obsidian_note_from_note(reference_note=anki_note)
+    obsidian_notes_manager.commit_sync()
+
+    assert obsidian_note.file.path.exists()
+
+    read_paths = []
+    original_read_text = Path.read_text
+
+    def read_text(self, *args, **kwargs):
+        read_paths.append(self)
+        return original_read_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "read_text", read_text)
+    addon_metadata._last_sync_timestamp = int(time.time()) + 1
+    notes = obsidian_notes_manager.get_all_notes_categorized()
+
+    assert obsidian_note.file.path not in read_paths
+    assert anki_note.id in notes.unchanged_notes
+
+
+def test_notes_written_in_background_are_written_when_sync_ends_without_commit(
+    anki_setup_and_teardown,
+    obsidian_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    addon_metadata: AddonMetadata,
+    obsidian_notes_manager: ObsidianNotesManager,
+):
+    anki_test_app.set_config_value(config_name=CONF_WRITE_OBSIDIAN_FILES_IN_BACKGROUND, value=True)
+    note = build_basic_anki_note(
+        anki_test_app=anki_test_app,
+        front_text="Some front",
+        back_text="Some back",
+    )
+    anki_note = anki_test_app.add_note(note=note, deck_name=addon_config.anki_deck_name_for_obsidian_imports)
+
+    obsidian_notes_manager.get_all_notes_categorized()
+    obsidian_note = obsidian_notes_manager.create_new_obsidian_note_from_note(reference_note=anki_note)
+    obsidian_notes_manager.end_sync()
+
+    assert obsidian_note.file.path.exists()
+    vault_index = obsidian_notes_manager._obsidian_vault.index
+    vault_index.load()
+    assert vault_index.get_entry(path=obsidian_note.file.path) is None
+
+
+def test_delete_notes_to_local_trash_renames_notes_with_taken_names(
+    anki_setup_and_teardown,
+    obsidian_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_config: AddonConfig,
+    addon_metadata: AddonMetadata,
+    srs_folder_in_obsidian: Path,
+    obsidian_notes_manager: ObsidianNotesManager,
+    monkeypatch,
+):
+    monkeypatch.setattr(ObsidianConfig, "trash_option", property(lambda self: OBSIDIAN_LOCAL_TRASH_OPTION_VALUE))
+    trash_folder = addon_config.obsidian_vault_path / OBSIDIAN_LOCAL_TRASH_FOLDER
+    trash_folder.mkdir(parents=True, exist_ok=True)
+    (trash_folder / "test.md").write_text("Some previously deleted note", encoding="utf-8")
+    for note_id, folder_name in enumerate(["first", "second"], start=1):
+        build_basic_obsidian_note(
+            anki_test_app=anki_test_app,
+            front_text="Some front",
+            back_text="Some back",
+            file_path=srs_folder_in_obsidian / folder_name / "test.md",
+            mock_note_id=note_id,
+        )
+
+    with addon_metadata:
+        addon_metadata._last_sync_timestamp = int(time.time()) + 1
+        notes = obsidian_notes_manager.get_all_notes_categorized()
+    obsidian_notes_manager.delete_notes(notes=list(notes.unchanged_notes.values()))
+
+    assert sorted(path.name for path in trash_folder.iterdir()) == ["test 1.md", "test 2.md", "test.md"]
+    assert not list(srs_folder_in_obsidian.rglob("*.md"))
+
+
+def test_delete_notes_forgets_notes_deleted_before_a_failure(
+    anki_setup_and_teardown,
+    obsidian_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    addon_metadata: AddonMetadata,
+    srs_folder_in_obsidian: Path,
+    obsidian_notes_manager: ObsidianNotesManager,
+    monkeypatch,
+):
+    monkeypatch.setattr(ObsidianConfig, "trash_option", property(lambda self: OBSIDIAN_PERMA_DELETE_TRASH_OPTION_VALUE))
+    for note_id in [1, 2]:
+        build_basic_obsidian_note(
+            anki_test_app=anki_test_app,
+            front_text="Some front",
+            back_text="Some back",
+            file_path=srs_folder_in_obsidian / f"test {note_id}.md",
+            mock_note_id=note_id,
+        )
+    addon_metadata._last_sync_timestamp = int(time.time()) + 1
+    notes = obsidian_notes_manager.get_all_notes_categorized()
+    first_note, second_note = notes.unchanged_notes[1], notes.unchanged_notes[2]
+    original_unlink = Path.unlink
+
+    def unlink(self, *args, **kwargs):
+        if self == second_note.file.path:
+            raise PermissionError(self)
+        original_unlink(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "unlink", unlink)
+    with pytest.raises(PermissionError):
+        obsidian_notes_manager.delete_notes(notes=[first_note, second_note])
+
+    vault = obsidian_notes_manager._obsidian_vault
+    assert vault.index.get_entry(path=first_note.file.path) is None
+    assert not vault.attachments_manager.check_is_vault_file(path=first_note.file.path)
+    assert vault.index.get_entry(path=second_note.file.path) is not None
+    assert vault.attachments_manager.check_is_vault_file(path=second_note.file.path)
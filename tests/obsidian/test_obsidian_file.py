@@ -11,7 +11,7 @@ from obsidian_sync.constants import SRS_NOTE_FIELD_IDENTIFIER_COMMENT, MARKDOWN_
     SRS_HEADER_TITLE_LEVEL, MODEL_ID_PROPERTY_NAME, \
     MODEL_NAME_PROPERTY_NAME, NOTE_ID_PROPERTY_NAME, TAGS_PROPERTY_NAME, \
     DEFAULT_NOTE_ID_FOR_NEW_NOTES, DATE_MODIFIED_PROPERTY_NAME, DATETIME_FORMAT
-from obsidian_sync.obsidian.content.field.obsidian_note_field import ObsidianNoteFieldFactory
+from obsidian_sync.obsidian.content.field.obsidian_note_field import ObsidianNoteFieldFactory, ObsidianNoteField
 from obsidian_sync.obsidian.content.field.obsidian_template_field import ObsidianTemplateFieldFactory
 from obsidian_sync.obsidian.content.obsidian_properties import ObsidianTemplateProperties, ObsidianNoteProperties
 from obsidian_sync.obsidian.content.obsidian_reference import ObsidianMediaReference
@@ -138,3 +138,17 @@ Some back [image link]({urllib.parse.quote(string=str(image_file.relative_to(obs
 
     assert isinstance(media_reference, ObsidianMediaReference)
     assert media_reference.path == image_file
+
+
+def test_note_field_markup_is_derived_once_per_text():
+    field = ObsidianNoteField(name="Front", text="Some *emphasized* text", references=[])
+
+    html_text = field.to_html()
+
+    assert field.to_html() is html_text
+    assert field == ObsidianNoteField(name="Front", text="Some *emphasized* text", references=[])
+
+    field.set_from_markdown(markdown="Some **bold** text")
+
+    assert field.to_html() == "<p>Some <strong>bold</strong> text</p>"
+    assert field != ObsidianNoteField(name="Front", text="Some *emphasized* text", references=[])
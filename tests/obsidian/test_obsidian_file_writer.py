@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pytest
+
+from obsidian_sync.obsidian.obsidian_file_writer import ObsidianFileWriter
+
+
+def test_file_writer_writes_queued_files_once_drained(tmp_path: Path):
+    file_writer = ObsidianFileWriter()
+    first_path = tmp_path / "first.md"
+    second_path = tmp_path / "second.md"
+
+    file_writer.write(path=first_path, text="Some text")
+    file_writer.write(path=second_path, text="Some other text")
+    file_writer.write(path=first_path, text="Some updated text")
+    written_file_stats = file_writer.drain()
+
+    assert first_path.read_text(encoding="utf-8") == "Some updated text"
+    assert second_path.read_text(encoding="utf-8") == "Some other text"
+    assert written_file_stats[first_path].st_mtime_ns == first_path.stat().st_mtime_ns
+    assert set(written_file_stats) == {first_path, second_path}
+    assert sorted(tmp_path.iterdir()) == [first_path, second_path]  # no temporary file left behind
+    assert file_writer.drain() == {}
+
+
+def test_file_writer_raises_write_error_on_drain(tmp_path: Path):
+    file_writer = ObsidianFileWriter()
+    valid_path = tmp_path / "valid.md"
+
+    file_writer.write(path=tmp_path / "missing folder" / "invalid.md", text="Some text")
+    file_writer.write(path=valid_path, text="Some other text")
+
+    with pytest.raises(OSError):
+        file_writer.drain()
+
+    assert valid_path.read_text(encoding="utf-8") == "Some other text"
+    assert file_writer.drain() == {}
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from obsidian_sync.obsidian.reference_manager import ObsidianReferencesManager
+
+
+def test_media_reference_by_file_name_resolves_to_file_in_note_folder(
+    obsidian_setup_and_teardown,
+    srs_folder_in_obsidian: Path,
+    obsidian_references_manager: ObsidianReferencesManager,
+):
+    other_folder = srs_folder_in_obsidian / "other"
+    other_folder.mkdir(parents=True)
+    (srs_folder_in_obsidian / "image.png").touch()
+    (other_folder / "image.png").touch()
+    note_path = srs_folder_in_obsidian / "test.md"
+
+    referenced_files = obsidian_references_manager.media_paths_from_file_text(
+        file_text="![](image.png)", note_path=note_path
+    )
+
+    assert len(referenced_files) == 1
+    assert referenced_files[0].path == srs_folder_in_obsidian / "image.png"
+
+
+def test_media_reference_by_file_name_ignores_files_in_hidden_folders(
+    obsidian_setup_and_teardown,
+    srs_folder_in_obsidian: Path,
+    obsidian_references_manager: ObsidianReferencesManager,
+):
+    hidden_folder = srs_folder_in_obsidian / ".hidden"
+    hidden_folder.mkdir(parents=True)
+    (hidden_folder / "hidden-image.png").touch()
+    note_path = srs_folder_in_obsidian / "test.md"
+
+    referenced_files = obsidian_references_manager.media_paths_from_file_text(
+        file_text="![](hidden-image.png)", note_path=note_path
+    )
+
+    assert len(referenced_files) == 0
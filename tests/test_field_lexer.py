@@ -0,0 +1,30 @@
+from obsidian_sync.constants import TEXT_FIELD_TOKEN, LATEX_FIELD_TOKEN, LINK_FIELD_TOKEN, CODE_FIELD_TOKEN, \
+    HTML_FIELD_TOKEN
+from obsidian_sync.field_lexer import tokenize_field_text, FieldToken
+
+
+def test_tokenize_field_text():
+    field_text = 'Math $x_1$ and `code_span`, <b>bold</b> ![image](some%20image.png "A (title)").'
+
+    tokens = tokenize_field_text(field_text=field_text)
+
+    assert tokens == (
+        FieldToken(kind=TEXT_FIELD_TOKEN, text="Math "),
+        FieldToken(kind=LATEX_FIELD_TOKEN, text="$x_1$"),
+        FieldToken(kind=TEXT_FIELD_TOKEN, text=" and "),
+        FieldToken(kind=CODE_FIELD_TOKEN, text="`code_span`"),
+        FieldToken(kind=TEXT_FIELD_TOKEN, text=", "),
+        FieldToken(kind=HTML_FIELD_TOKEN, text="<b>"),
+        FieldToken(kind=TEXT_FIELD_TOKEN, text="bold"),
+        FieldToken(kind=HTML_FIELD_TOKEN, text="</b>"),
+        FieldToken(kind=TEXT_FIELD_TOKEN, text=" "),
+        FieldToken(kind=LINK_FIELD_TOKEN, text='![image](some%20image.png "A (title)")'),
+        FieldToken(kind=TEXT_FIELD_TOKEN, text="."),
+    )
+    assert "".join(token.text for token in tokens) == field_text
+
+
+def test_tokenize_field_text_keeps_links_with_parentheses_in_the_path_whole():
+    tokens = tokenize_field_text(field_text="[Some note](some%20note%20(1).md#Heading)")
+
+    assert tokens == (FieldToken(kind=LINK_FIELD_TOKEN, text="[Some note](some%20note%20(1).md#Heading)"),)
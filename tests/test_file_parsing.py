@@ -4,7 +4,7 @@ from pathlib import Path
 import pytest
 
 from obsidian_sync.constants import SRS_PROPERTIES_DELIMITER, MODEL_ID_PROPERTY_NAME, SRS_NOTE_IDENTIFIER_COMMENT
-from obsidian_sync.file_utils import check_is_markdown_file, check_is_srs_note_and_get_id
+from obsidian_sync.file_utils import check_is_markdown_file, check_is_srs_note_and_get_id, read_srs_file_header
 from tests.anki_test_app import AnkiTestApp
 from tests.utils import build_basic_obsidian_note
 
@@ -111,3 +111,26 @@ def test_third_approach_to_file_parsing(
     print(f"took {t1 - t0} seconds")
 
     assert check_is_srs_note_and_get_id(file_path) == note_id
+
+
+def test_srs_file_header_excludes_the_note_body(
+    anki_setup_and_teardown,
+    obsidian_setup_and_teardown,
+    anki_test_app: AnkiTestApp,
+    srs_folder_in_obsidian: Path,
+):
+    file_path = srs_folder_in_obsidian / "some_test.md"
+    note_id = 1
+    build_basic_obsidian_note(
+        anki_test_app=anki_test_app,
+        front_text="Some front",
+        back_text="Some back " * 100000,
+        file_path=file_path,
+        mock_note_id=note_id,
+    )
+
+    file_header = read_srs_file_header(path=file_path)
+
+    assert SRS_NOTE_IDENTIFIER_COMMENT in file_header
+    assert len(file_header) < file_path.stat().st_size
+    assert check_is_srs_note_and_get_id(file_path) == note_id
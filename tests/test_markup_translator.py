@@ -1,6 +1,12 @@
+import sys
+import threading
+from pathlib import Path
+
 import pytest
 
-from obsidian_sync.markup_translator import MarkupTranslator
+from obsidian_sync.constants import MARKUP_TRANSLATION_PROCESS_BATCH_MIN_SIZE, MARKDOWN_TO_HTML_TRANSLATION
+from obsidian_sync.markup_translation_cache import MarkupTranslationCache
+from obsidian_sync.markup_translator import MarkupTranslator, get_markup_translator
 
 
 def test_translate_html_with_latex_in_line_math_statement_to_markdown():
@@ -154,6 +160,32 @@ def test_translating_misaligned_latex_escape():
     assert markdown_text == expected_markdown
 
 
+def test_translating_latex_in_in_line_code_is_not_escaped():
+    markup_translator = MarkupTranslator()
+
+    text = "`$a_b$`"
+    markdown_text = markup_translator.translate_html_to_markdown(html=text)
+
+    assert markdown_text == text
+
+    sanitized_html_text = markup_translator.sanitize_html(html=text)
+
+    assert sanitized_html_text == "<p><code>$a_b$</code></p>"
+
+
+def test_translating_latex_in_link_text_is_not_escaped():
+    markup_translator = MarkupTranslator()
+
+    text = "[x_$a*b$](u)"
+    markdown_text = markup_translator.translate_html_to_markdown(html=text)
+
+    assert markdown_text == "[x\\_$a*b$](u)"
+
+    sanitized_html_text = markup_translator.sanitize_html(html=text)
+
+    assert sanitized_html_text == "<p><a href=\"u\">x_\\(a*b\\)</a></p>"
+
+
 def test_sanitize_special_characters():
     markup_translator = MarkupTranslator()
 
@@ -168,3 +200,149 @@ def test_sanitize_special_characters():
 
     assert markdown_text == expected_markdown
 
+
+
+def test_markdown_link_reference_definitions_do_not_leak_between_translations():
+    markup_translator = get_markup_translator()
+
+    markup_translator.translate_markdown_to_html(markdown="[Some link][ref]\n\n[ref]: https://example.com")
+    html_text = markup_translator.translate_markdown_to_html(markdown="[Some link][ref]")
+
+    assert html_text == "<p>[Some link][ref]</p>"
+
+
+def test_get_markup_translator_returns_one_translator_per_thread():
+    markup_translators = []
+    thread = threading.Thread(target=lambda: markup_translators.append(get_markup_translator()))
+    thread.start()
+    thread.join()
+
+    assert get_markup_translator() is get_markup_translator()
+    assert markup_translators[0] is not get_markup_translator()
+
+
+def test_cached_translations_are_reused_across_syncs(tmp_path: Path):
+    cache_path = tmp_path / "markup_translation_cache.sqlite3"
+    markdown_text = "Some **bold** text with math $x = 1$"
+    translation_cache = MarkupTranslationCache(signature="signature")
+    translation_cache.load(database_path=cache_path, max_disk_size_mb=1)
+    html_text = MarkupTranslator(translation_cache=translation_cache).translate_markdown_to_html(
+        markdown=markdown_text
+    )
+    translation_cache.commit()
+
+    assert html_text == MarkupTranslator().translate_markdown_to_html(markdown=markdown_text)
+
+    translation_cache = MarkupTranslationCache(signature="signature")
+    translation_cache.load(database_path=cache_path, max_disk_size_mb=1)
+
+    assert translation_cache.get(translation="markdown-to-html", text=markdown_text) == html_text
+
+
+def test_cached_translations_are_dropped_when_the_translator_signature_changes(tmp_path: Path):
+    cache_path = tmp_path / "markup_translation_cache.sqlite3"
+    translation_cache = MarkupTranslationCache(signature="signature")
+    translation_cache.load(database_path=cache_path, max_disk_size_mb=1)
+    translation_cache.put(translation="markdown-to-html", text="Some text", translated_text="<p>Some text</p>")
+    translation_cache.commit()
+
+    translation_cache = MarkupTranslationCache(signature="other-signature")
+    translation_cache.load(database_path=cache_path, max_disk_size_mb=1)
+
+    assert translation_cache.get(translation="markdown-to-html", text="Some text") is None
+
+
+def test_sanitized_text_is_unchanged_by_sanitization():
+    markup_translator = MarkupTranslator()
+
+    markdown_text = "Some *emphasized* text with math $x = 1$"
+    sanitized_markdown_text = markup_translator.sanitize_markdown(markdown=markdown_text)
+    html_text = "<p>Some <em>emphasized</em> text with math \\(x = 1\\)</p>"
+    sanitized_html_text = markup_translator.sanitize_html(html=html_text)
+
+    assert markup_translator.sanitize_markdown(markdown=sanitized_markdown_text) == sanitized_markdown_text
+    assert markup_translator.sanitize_html(html=sanitized_html_text) == sanitized_html_text
+
+
+def test_stable_texts_are_cached_as_stable(tmp_path: Path):
+    cache_path = tmp_path / "markup_translation_cache.sqlite3"
+    translation_cache = MarkupTranslationCache(signature="signature")
+    translation_cache.load(database_path=cache_path, max_disk_size_mb=1)
+    translation_cache.put(translation="sanitize-html", text="<p>Some text</p>", translated_text="<p>Some text</p>")
+    translation_cache.commit()
+
+    translation_cache = MarkupTranslationCache(signature="signature")
+    translation_cache.load(database_path=cache_path, max_disk_size_mb=1)
+
+    assert translation_cache.get(translation="sanitize-html", text="<p>Some text</p>") == "<p>Some text</p>"
+    assert translation_cache.get(translation="sanitize-html", text="<p>Other text</p>") is None
+
+
+@pytest.mark.parametrize(
+    "plain_text",
+    [
+        "word",
+        "Some words, with punctuation. Really!",
+        "A \"quoted\" and 'single quoted' (parenthesized) a/b text",
+        "Non-ASCII wörds and 日本語",
+        "2024 was a year: 365 days",
+    ],
+)
+def test_plain_text_translations_match_the_converters(plain_text: str):
+    markup_translator = MarkupTranslator()
+    markdown_to_html_converter = markup_translator._markdown_to_html_converter
+    html_to_markdown_converter = markup_translator._html_to_markdown_converter
+
+    for markdown_text in [plain_text, f"\n{plain_text}\n"]:
+        expected_html_text = markdown_to_html_converter.reset().convert(source=markdown_text)
+        assert markup_translator.translate_markdown_to_html(markdown=markdown_text) == expected_html_text
+    for html_text in [plain_text, f"<p>{plain_text}</p>"]:
+        expected_markdown_text = html_to_markdown_converter.convert(html=html_text)
+        assert markup_translator.translate_html_to_markdown(html=html_text) == expected_markdown_text
+    expected_markdown_text = html_to_markdown_converter.convert(
+        html=markdown_to_html_converter.reset().convert(
+            source=html_to_markdown_converter.convert(
+                html=markdown_to_html_converter.reset().convert(source=plain_text)
+            )
+        )
+    )
+    assert markup_translator.sanitize_markdown(markdown=plain_text) == expected_markdown_text
+
+
+@pytest.mark.parametrize("markup_text", ["1. item", "- item", "*emphasis*", "a_b", "a  b", " indented", "a & b"])
+def test_markup_texts_take_the_converters_path(markup_text: str):
+    markup_translator = MarkupTranslator()
+
+    expected_html_text = markup_translator._markdown_to_html_converter.reset().convert(source=markup_text)
+
+    assert markup_translator.translate_markdown_to_html(markdown=markup_text) == expected_html_text
+
+
+def test_translate_many_in_processes_matches_single_translations():
+    markup_translator = MarkupTranslator()
+    markdown_texts = [f"Field *{i}* with math $x = {i}$" for i in range(MARKUP_TRANSLATION_PROCESS_BATCH_MIN_SIZE)]
+    markdown_texts.append(markdown_texts[0])
+
+    html_texts = markup_translator.translate_many(
+        texts=markdown_texts, translation=MARKDOWN_TO_HTML_TRANSLATION, process_count=2
+    )
+
+    assert html_texts == [
+        markup_translator.translate_markdown_to_html(markdown=markdown_text) for markdown_text in markdown_texts
+    ]
+
+
+def test_translate_many_in_frozen_build_translates_in_this_process(monkeypatch):
+    markup_translator = MarkupTranslator()
+    markdown_texts = [f"Field *{i}*" for i in range(MARKUP_TRANSLATION_PROCESS_BATCH_MIN_SIZE)]
+
+    def translate_in_processes(*args, **kwargs):
+        raise AssertionError("The markup must not be translated in separate processes.")
+
+    monkeypatch.setattr(sys, "frozen", True, raising=False)
+    monkeypatch.setattr(markup_translator, "_translate_in_processes", translate_in_processes)
+    html_texts = markup_translator.translate_many(
+        texts=markdown_texts, translation=MARKDOWN_TO_HTML_TRANSLATION, process_count=2
+    )
+
+    assert html_texts == [f"<p>Field <em>{i}</em></p>" for i in range(MARKUP_TRANSLATION_PROCESS_BATCH_MIN_SIZE)]
@@ -0,0 +1,21 @@
+import json
+from pathlib import Path
+
+from obsidian_sync.logging.sync_report import SyncReport
+
+
+def test_sync_report_is_appended_to_the_reports_file(tmp_path: Path):
+    reports_path = tmp_path / "sync_reports.jsonl"
+
+    for note_count in [1, 2, 3]:
+        sync_report = SyncReport()
+        with sync_report.time_phase(name="vault scan") as phase:
+            phase.item_count = note_count
+        sync_report.save(path=reports_path, counts={"new": note_count}, max_records=2)
+
+    records = [json.loads(line) for line in reports_path.read_text().splitlines()]
+
+    assert [record["counts"]["new"] for record in records] == [2, 3]
+    assert records[-1]["phases"][0]["name"] == "vault scan"
+    assert records[-1]["phases"][0]["item_count"] == 3
+    assert "vault scan" in sync_report.to_summary()